@@ -5,17 +5,22 @@ API_HEADERS = {
     "Content-Type": "application/json"
 }
 
+# Each endpoint carries its own refresh cadence (hours) and priority (1 = fetched first).
+# Fast-moving transactional data refreshes often; reference data only a few times a week.
 API_ENDPOINTS = {
-    "leave_balance": "https://hr.qbadvisory.com/api/method/hrms.api.employee.get_all_employees_leave_balance",
-    "leave_applications": "https://hr.qbadvisory.com/api/method/hrms.api.employee.get_all_employees_leave_applications",
-    "attendance": "https://hr.qbadvisory.com/api/method/hrms.api.employee.get_all_attendance",
-    "timesheet": "https://hr.qbadvisory.com/api/method/hrms.api.employee.get_all_users_timesheet_details",
-    "project_allocations": "https://hr.qbadvisory.com/api/method/hrms.api.employee.get_user_project_allocations",
-    "projects_details": "https://hr.qbadvisory.com/api/method/hrms.api.employee.get_all_projects_details",
-    "managers": "https://hr.qbadvisory.com/api/method/hrms.api.employee.get_all_managers_with_departments",
-    "holidays": "https://hr.qbadvisory.com/api/method/hrms.api.employee.get_all_holidays",
-    "users_details": "https://hr.qbadvisory.com/api/method/hrms.api.employee.get_all_users_details"
+    "attendance": {"url": "https://hr.qbadvisory.com/api/method/hrms.api.employee.get_all_attendance", "refresh_hours": 1, "priority": 1},
+    "leave_applications": {"url": "https://hr.qbadvisory.com/api/method/hrms.api.employee.get_all_employees_leave_applications", "refresh_hours": 1, "priority": 1},
+    "timesheet": {"url": "https://hr.qbadvisory.com/api/method/hrms.api.employee.get_all_users_timesheet_details", "refresh_hours": 2, "priority": 2},
+    "leave_balance": {"url": "https://hr.qbadvisory.com/api/method/hrms.api.employee.get_all_employees_leave_balance", "refresh_hours": 4, "priority": 2},
+    "users_details": {"url": "https://hr.qbadvisory.com/api/method/hrms.api.employee.get_all_users_details", "refresh_hours": 24, "priority": 3},
+    "project_allocations": {"url": "https://hr.qbadvisory.com/api/method/hrms.api.employee.get_user_project_allocations", "refresh_hours": 24, "priority": 3},
+    "projects_details": {"url": "https://hr.qbadvisory.com/api/method/hrms.api.employee.get_all_projects_details", "refresh_hours": 168, "priority": 4},
+    "managers": {"url": "https://hr.qbadvisory.com/api/method/hrms.api.employee.get_all_managers_with_departments", "refresh_hours": 168, "priority": 4},
+    "holidays": {"url": "https://hr.qbadvisory.com/api/method/hrms.api.employee.get_all_holidays", "refresh_hours": 168, "priority": 4}
 }
 
-# ETL Cache Threshold (hours) - Skip refresh if data is newer than this
+# ETL Cache Threshold (hours) - Default cadence for endpoints without their own 'refresh_hours'
 ETL_CACHE_THRESHOLD_HOURS = 4
+
+# Max parallel HRMS requests (due endpoints are submitted in priority order)
+ETL_MAX_WORKERS = 4
@@ -1,14 +1,23 @@
 from src.extract import extract_data
 from src.transform import transform_data
+from src.schedule import get_due_endpoints
 import Config as config
 import os
+import sys
 
 def main():
-    print("starting ETL Pipeline...")
-    for name, url in config.API_ENDPOINTS.items():
-        extract_data(name, url, config.API_HEADERS)
+    # Pass --force to refresh every endpoint regardless of its cadence
+    if "--force" in sys.argv:
+        due = sorted(config.API_ENDPOINTS, key=lambda n: config.API_ENDPOINTS[n].get("priority", 99))
+    else:
+        due = get_due_endpoints(config.API_ENDPOINTS, config.ETL_CACHE_THRESHOLD_HOURS)
+    if not due:
+        print("All endpoints are within their refresh cadence. Nothing to do.")
+        return
+    print(f"starting ETL Pipeline for: {', '.join(due)}...")
+    refreshed = [name for name in due if extract_data(name, config.API_ENDPOINTS[name]["url"], config.API_HEADERS)]
     print("\n--- Phase 2: Transformation ---")
-    transform_data()
+    transform_data(refreshed)
 
 if __name__ == "__main__":
     main()
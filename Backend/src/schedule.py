@@ -0,0 +1,39 @@
+import os
+import glob
+import time
+
+# Path relative to Backend directory
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_RAW_DIR = os.path.join(BACKEND_DIR, "data", "raw")
+
+# Processed tables derived from more than one endpoint (re-derived when any source refreshes)
+DERIVED_TABLES = {
+    "date_table": ["leave_applications", "holidays"]
+}
+
+def get_latest_file(endpoint_name):
+    pattern = os.path.join(DATA_RAW_DIR, f"{endpoint_name}_*.json")
+    list_of_files = glob.glob(pattern)
+    if not list_of_files: return None
+    return max(list_of_files, key=os.path.getctime)
+
+def get_fetch_age(name):
+    """Age in seconds of the endpoint's last successful fetch (its newest raw file), or None if it was never fetched.
+    Endpoints returning no rows get no processed table, so the raw file is what records the refresh."""
+    latest = get_latest_file(name)
+    return None if latest is None else time.time() - os.path.getctime(latest)
+
+def get_due_endpoints(endpoints, default_hours):
+    """Returns the endpoint names last fetched longer ago than their refresh cadence, by priority."""
+    due = []
+    for name, ep in endpoints.items():
+        age = get_fetch_age(name)
+        if age is None or age >= ep.get("refresh_hours", default_hours) * 3600:
+            due.append(name)
+    return sorted(due, key=lambda n: endpoints[n].get("priority", 99))
+
+def get_affected_tables(endpoints):
+    """Processed tables to rebuild after the given endpoints were refreshed (including derived ones)."""
+    refreshed = set(endpoints)
+    derived = [t for t, sources in DERIVED_TABLES.items() if refreshed & set(sources)]
+    return sorted(refreshed) + derived
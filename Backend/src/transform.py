@@ -6,18 +6,13 @@ from datetime import datetime
 import re
 import numpy as np
 import ast
+from src.schedule import get_affected_tables, get_latest_file
 
 # Path relative to Backend directory
 BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DATA_RAW_DIR = os.path.join(BACKEND_DIR, "data", "raw")
 DATA_PROCESSED_DIR = os.path.join(BACKEND_DIR, "data", "processed")
 
-def get_latest_file(endpoint_name):
-    pattern = os.path.join(DATA_RAW_DIR, f"{endpoint_name}_*.json")
-    list_of_files = glob.glob(pattern)
-    if not list_of_files: return None
-    return max(list_of_files, key=os.path.getctime)
-
 def process_generic(raw_data):
     try:
         data_list = raw_data['message']['data']
@@ -71,9 +66,12 @@ def apply_calculations(df, endpoint):
     except Exception as e: print(f"Calculation error: {e}")
     return df
 
-def transform_data():
+def transform_data(endpoints=None):
+    """Rebuilds processed tables. When `endpoints` is given, only those tables (and the
+    derived tables that depend on them) are re-derived; otherwise everything is."""
     all_files = glob.glob(os.path.join(DATA_RAW_DIR, '*.json'))
     endpoints_found = {re.search(r'^(.*)_\d{8}_\d{6}\.json$', os.path.basename(f)).group(1) for f in all_files if re.search(r'^(.*)_\d{8}_\d{6}\.json$', os.path.basename(f))}
+    if endpoints is not None: endpoints_found &= set(endpoints)
     os.makedirs(DATA_PROCESSED_DIR, exist_ok=True)
     for endpoint in endpoints_found:
         latest_file = get_latest_file(endpoint)
@@ -89,8 +87,9 @@ def transform_data():
                 df.to_parquet(os.path.join(DATA_PROCESSED_DIR, f"{endpoint}.parquet"), index=False)
             except Exception as e:
                 print(f"[WARNING] Could not save {endpoint}.parquet: {e}")
-    try: create_date_table()
-    except: pass
+    if endpoints is None or 'date_table' in get_affected_tables(endpoints):
+        try: create_date_table()
+        except: pass
 
 def create_date_table():
     try:
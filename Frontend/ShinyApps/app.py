@@ -1,8 +1,13 @@
-from shiny import App, ui, render, reactive
+from shiny import App, ui, render, reactive, req
 import pandas as pd
-import plotly.express as px
+import numpy as np
 import plotly.graph_objects as go
-import os, ast
+import plotly.io as pio
+import os, ast, calendar, hashlib, threading, sys, time, asyncio
+from collections import namedtuple, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, answer_challenge, deliver_challenge
 from shinywidgets import output_widget, render_plotly
 
 # ====================================================
@@ -11,23 +16,259 @@ from shinywidgets import output_widget, render_plotly
 APP_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.normpath(os.path.join(APP_DIR, "..", "..", "Backend", "data", "processed"))
 
+# Filtered frames share column data with DB.DF (Copy-on-Write, default from pandas 3)
+if int(pd.__version__.split('.')[0]) < 3: pd.set_option('mode.copy_on_write', True)
+
+# Slicer state key -> (column, title-cased match) for the per-dimension row indexes
+SLICER_DIMS = {
+    'dept': ('department_name_t', False),
+    'emp': ('employee_name_t', False),
+    'et': ('employment_type_t', False),
+    'mgr': ('reporting_manager_name_t', False),
+    'ws': ('workflow_state', False),
+    'lt': ('leave_type', True),
+    'at': ('mode_of_attendance', True),
+}
+# Low-cardinality string columns held dictionary-encoded (categorical), per table
+CATEGORICAL_COLUMNS = {
+    'users_details': ['department_name_t', 'employee_name_t', 'reporting_manager_name_t', 'employment_type_t'],
+    'attendance': ['presence_type', 'mode_of_attendance', 'workflow_state'],
+    'leave_applications': ['status', 'leave_type'],
+}
+# Stacking order of the Daily Attendance bars (unknown presence types go last)
+PRESENCE_ORDER = ["Work From Office", "Work From Home", "On Duty", "Work From Anywhere", "Missed Entry", "On Leave"]
+# Office-hours buckets (DAX logic): < 3, 3-6, 6+ hours
+HOURS_BUCKETS = ["< 3 hours", "3-6 hours", "6+ hours"]
+# Dated charts: most bars per series before days roll up to weeks, then months (x-axis title per granularity)
+GRAIN_MAX_POINTS = 70
+GRAIN_TITLES = {'D': "Day of Month", 'W': "Week Starting", 'M': "Month"}
+GRID_PAGE_SIZES = ["25", "50", "100"]  # Rows per page of the paged tables (first = default)
+SLICER_DEBOUNCE_S = 0.3  # Quiet time after the last slicer edit before staged edits apply (auto-apply mode)
+INDEXED_TABLES = ['attendance', 'leave_applications', 'leave_balance', 'users_details', 'daily_presence', 'monthly_wfh', 'office_hours']
+ROW_SLICERS = {'ws': 'workflow_state', 'at': 'mode_of_attendance'}  # Attendance slicers below employee level
+NO_ROWS = np.empty(0, dtype=np.intp)
+NO_PERIOD = np.iinfo(np.int64).max  # Sort key for rows without a date (always last)
+MONTH_NUM = {calendar.month_name[i]: i for i in range(1, 13)}
+
+FILTER_KEYS = list(SLICER_DIMS) + ['proj', 'pm']
+# Tables read by each shared intermediate and chart/table query: only slicers applying to one of them
+# (DashboardData.dims) are part of its filter state, cache key and reactive dependencies
+SOURCES = {
+    'dates': ['date_table'],
+    'availability': ['date_table', 'users_details', 'leave_applications'],
+    'plt_trend': ['leave_applications', 'date_table'],
+    'plt_util': ['leave_applications', 'date_table', 'users_details'],
+    'plt_top': ['leave_applications'],
+    'plt_avail': ['date_table', 'users_details', 'leave_applications'],
+    'tbl_matrix': ['leave_applications'],
+    'plt_daily_att': ['attendance', 'daily_presence'],
+    'plt_hrs_dist': ['attendance', 'office_hours'],
+    'plt_wfh_comp': ['monthly_wfh'],
+}
+ACTIVE_STATUS = ['Approved', 'Open']
+RESULT_CACHE_BYTES = 256 * 1024 * 1024  # Process-wide bound for cached selections & chart inputs
+COMPUTE_WORKERS = 4  # Threads running the chart/table computations off the event loop (per process)
+# Optional shared compute service (compute_service.py) on this Unix socket (unset = compute in-process),
+# and its shared secret (required: the service unpickles requests, so only holders of the key may connect)
+COMPUTE_SOCKET = os.environ.get("DASHBOARD_COMPUTE_SOCKET")
+COMPUTE_KEY = os.environ.get("DASHBOARD_COMPUTE_KEY", "").encode()
+COMPUTE_RETRY_S = 30  # After a failed connection, compute in-process this long before trying the service again
+COMPUTE_TIMEOUT_S = 5  # Longest wait for the service's handshake or reply before computing in-process
+
+def ym_key(year, month):
+    """Integer year-month key (consecutive months differ by 1)."""
+    return int(year) * 12 + int(month) - 1
+
+def month_key(label):
+    """Year-month key of a "Mon YYYY" chart label (None when it does not parse)."""
+    try: t = pd.to_datetime(label, format='%b %Y')
+    except (ValueError, TypeError): return None
+    return None if pd.isna(t) else ym_key(t.year, t.month)
+
+def month_label(ym):
+    """Chart label ("Mon YYYY") of year-month key `ym` (inverse of month_key)."""
+    return f"{calendar.month_abbr[ym % 12 + 1]} {ym // 12}"
+
+def month_slices(ym, months):
+    """Slices (lo, hi) of the sorted year-month keys `ym` falling in the keys `months`, found by
+    binary search (one per run of consecutive months)."""
+    runs = []
+    for k in sorted(set(months)):
+        if runs and k == runs[-1][1] + 1: runs[-1][1] = k
+        else: runs.append([k, k])
+    return [(np.searchsorted(ym, a, 'left'), np.searchsorted(ym, b, 'right')) for a, b in runs]
+
+def hours_bucket(hours):
+    """Office-hours bucket of each value in `hours` (missing hours have no bucket)."""
+    h = np.asarray(hours, dtype=float)
+    return pd.Categorical(np.select([h < 3, h < 6, h >= 6], HOURS_BUCKETS, default=None), categories=HOURS_BUCKETS)
+
+def day_key(dates):
+    """Integer day numbers (days since 1970-01-01, wall-clock date) of `dates`; NO_PERIOD for missing."""
+    d = pd.to_datetime(dates, errors='coerce')
+    if d.dt.tz is not None: d = d.dt.tz_localize(None)
+    ok = d.notna().to_numpy()
+    day = np.full(len(d), NO_PERIOD, dtype=np.int64)
+    day[ok] = d.to_numpy().astype('datetime64[D]').astype(np.int64)[ok]
+    return day
+
+def grain_start(days, grain):
+    """First calendar day of the day ('D'), Monday-based week ('W') or month ('M') holding each of `days`."""
+    d = pd.Series(pd.to_datetime(days)).dt.normalize()
+    if grain == 'W': return d - pd.to_timedelta(d.dt.dayofweek, unit='D')
+    if grain == 'M': return d.dt.to_period('M').dt.to_timestamp()
+    return d
+
+def time_grain(days):
+    """Finest granularity that plots the distinct dates `days` in at most GRAIN_MAX_POINTS bars."""
+    for grain in ('D', 'W'):
+        if grain_start(days, grain).nunique() <= GRAIN_MAX_POINTS: return grain
+    return 'M'
+
+def grain_buckets(days, grain):
+    """Per distinct day (date_key): the bar it rolls up to - first/last day present in the bar (the drill range),
+    category label and tick text."""
+    b = pd.DataFrame({'Day': pd.Series(pd.to_datetime(days)).dt.normalize().drop_duplicates().sort_values(ignore_index=True)})
+    b['date_key'] = day_key(b['Day'])
+    start = grain_start(b['Day'], grain)
+    b['First'], b['Last'] = b.groupby(start)['Day'].transform('min'), b.groupby(start)['Day'].transform('max')
+    label, tick = {'D': ('%d %b', '%d'), 'W': ('%d %b %Y', '%d'), 'M': ('%b %Y', '%b')}[grain]
+    b['DayLabel'], b['DayNum'] = start.dt.strftime(label), start.dt.strftime(tick).str.lstrip('0')
+    return b
+
+def leave_occupancy(leaves, *cols):
+    """Distinct (emp_key, date_key) pairs covered by the leave intervals in `leaves`: one row per
+    person per day on leave (and per value of the leaves' `cols`), however many applications
+    overlap that day."""
+    if leaves.empty or 'end_key' not in leaves.columns:
+        return pd.DataFrame({'emp_key': NO_ROWS, 'date_key': NO_ROWS, **{c: NO_ROWS for c in cols}})
+    start, end = leaves['date_key'].to_numpy(), leaves['end_key'].to_numpy()
+    ok = (start != NO_PERIOD) & (end != NO_PERIOD) & (end >= start)
+    start, end, emp = start[ok], end[ok], leaves['emp_key'].to_numpy()[ok]
+    n = end - start + 1
+    offset = np.arange(n.sum()) - np.repeat(np.cumsum(n) - n, n)
+    occ = pd.DataFrame({'emp_key': np.repeat(emp, n), 'date_key': np.repeat(start, n) + offset,
+                        **{c: np.repeat(leaves[c].to_numpy()[ok], n) for c in cols}})
+    return occ.drop_duplicates(ignore_index=True)
+
 # ====================================================
 #   DATA LAYER
 # ====================================================
+SOURCE_TABLES = ['attendance', 'users_details', 'leave_applications', 'date_table',
+                 'leave_balance', 'project_allocations', 'projects_details']
+
+def data_version():
+    """Version of the processed data on disk (stamp of the source files' paths and modification times)."""
+    stamp = hashlib.md5()
+    for f in SOURCE_TABLES:
+        for path in (os.path.join(DATA_DIR, f"{f}.parquet"), os.path.join(DATA_DIR, f"{f}.csv")):
+            if os.path.exists(path): stamp.update(f"{path}:{os.path.getmtime(path)}".encode())
+    return stamp.hexdigest()[:12]
+
+class Cube:
+    """In-memory OLAP cube: additive measures pre-aggregated at a base grain that includes the
+    employee (one cell per emp_key x year-month or day x the cube's own dimensions), cells sorted
+    by year-month. Any slicer state rolls the cells up exactly (sums of partial sums): the period
+    is a binary search, employee-level slicers select through a mask over emp_keys and the cube's
+    own row-level slicers through its dimension codes, so no fact row is read. Distinct employees
+    are exact too, as every cell belongs to one employee.
+
+    `slicers` maps the row-level slicer keys to the dimensions they filter; with `totals` those
+    dimensions also hold "All" roll-up cells (grouping sets), which an unset slicer selects. With
+    `apex`, the cells are also kept rolled up over employees (after the base cells, emp_key -1):
+    states selecting every employee read those instead, so a cube whose queries never break
+    results down by employee answers them from a few hundred cells."""
+    def __init__(self, cells, dims, measures, n_emp, slicers=None, totals=False, apex=False):
+        cells = cells.assign(cells=1.0)  # Base cells behind each cell (roll-up of cell counts)
+        self.split = len(cells)
+        if apex:
+            top = cells.groupby(['ym', *dims], observed=True, dropna=False)[[*measures, 'cells']].sum().reset_index()
+            cells = pd.concat([cells, top.assign(emp_key=-1)], ignore_index=True)
+        self.ym = cells['ym'].to_numpy(np.int64)
+        self.dims = {'emp_key': (cells['emp_key'].to_numpy(np.intp), pd.RangeIndex(n_emp))}
+        for d in dims:
+            cat = pd.Categorical(cells[d])
+            self.dims[d] = (cat.codes.astype(np.intp), cat.categories)
+        self.missing = {d: bool((codes < 0).any()) for d, (codes, _) in self.dims.items()}
+        self.measures = {m: cells[m].to_numpy(np.float64) for m in [*measures, 'cells']}
+        self.slicers = slicers or {}
+        self.totals = totals
+        # Slicer value of each label (title-cased for the title-matched slicers)
+        self.keys = {d: (self.labels(d).astype(str).str.title() if SLICER_DIMS[key][1] else self.labels(d)).to_numpy()
+                     for key, d in self.slicers.items()}
+
+    def labels(self, dim):
+        """Labels of dimension `dim`, in the order of its dense roll-up axis."""
+        return self.dims[dim][1]
+
+    def select(self, sel, months, emps, **where):
+        """Positions of the cells of employees `emps` (bool mask over emp_keys) in the year-month keys
+        `months` (None = all) that match the cube's slicers in `sel` and hold one of the labels
+        accepted in `where` (dimension -> labels)."""
+        lo, hi = (self.split, len(self.ym)) if emps.all() and self.split < len(self.ym) else (0, self.split)
+        if months is None: pos = np.arange(lo, hi)
+        else: pos = np.concatenate([np.arange(lo + a, lo + b) for a, b in month_slices(self.ym[lo:hi], months)] or [NO_ROWS])
+        accept = {d: self.labels(d).isin(vals) for d, vals in where.items()}
+        for key, d in self.slicers.items():
+            val = sel.get(key, "All")
+            if val != "All" or self.totals: accept[d] = self.keys[d] == val
+        keep = None if lo == self.split or emps.all() else emps[self.dims['emp_key'][0][pos]]
+        for d, ok in accept.items():
+            hit = np.append(ok, False)[self.dims[d][0][pos]]  # Missing labels (code -1) never match
+            keep = hit if keep is None else keep & hit
+        return pos if keep is None else pos[keep]
+
+    def codes(self, pos, by):
+        """Codes of the cells `pos` along the dimensions `by` (cells missing one left out), with the
+        shape of their dense roll-up, and the kept positions."""
+        ok = None
+        for d in by:
+            if not self.missing[d]: continue
+            has = self.dims[d][0][pos] >= 0
+            ok = has if ok is None else ok & has
+        if ok is not None: pos = pos[ok]
+        return [self.dims[d][0][pos] for d in by], tuple(len(self.labels(d)) for d in by), pos
+
+    def rollup(self, pos, by, measure=None):
+        """Sums of `measure` (base cell counts when None) over the cells `pos`, as a dense array with
+        one axis per dimension in `by` (in label order); cells without a label in `by` are left out."""
+        codes, shape, pos = self.codes(pos, by)
+        key = np.ravel_multi_index(codes, shape)
+        return np.bincount(key, weights=self.measures[measure or 'cells'][pos], minlength=int(np.prod(shape))).reshape(shape)
+
+    def distinct(self, pos, by):
+        """Distinct employees among the (base) cells `pos` per combination of the `by` dimensions
+        (dense, as rollup): each employee counts once however many of its cells share a combination."""
+        codes, shape, pos = self.codes(pos, ('emp_key', *by))
+        size = int(np.prod(shape[1:]))
+        key = np.sort(np.ravel_multi_index(codes, shape))
+        key = key[np.diff(key, prepend=-1) != 0]  # Each (employee, combination) once
+        return np.bincount(key % size, minlength=size).reshape(shape[1:])
+
 class DashboardData:
     def __init__(self):
         self.DF = {}
         self.Lists = {}
         self.Tree = {}
+        self.Index = {}
+        self.Period = {}
+        self.Members = {}
+        self.Lookup = {}
+        self.Cube = {}
+        self.LeaveSpan = 0
+        self.Version = None
         self.load()
+        self.build_cubes()
+        self.build_olap()
+        self.build_indexes()
+        self.build_members()
+        self.build_lookups()
 
     def load(self):
         print("--- Loading Data (v3.1) ---")
-        tables = [
-            'attendance', 'users_details', 'leave_applications', 'date_table', 
-            'leave_balance', 'project_allocations', 'projects_details'
-        ]
-        for f in tables:
+        # Data version (source file stamps): part of every result cache key
+        self.Version = data_version()
+        for f in SOURCE_TABLES:
             pq = os.path.join(DATA_DIR, f"{f}.parquet")
             cv = os.path.join(DATA_DIR, f"{f}.csv")
             if os.path.exists(pq):
@@ -60,42 +301,53 @@ class DashboardData:
                 pd_dt = pd_dt.rename(columns={'name': 'proj_id', 'full_name': 'project_manager'})
                 self.DF['projects_details_mapped'] = pd_dt
 
-            # Join Title Cased columns back to UD
-            self.DF['users_details'] = ud.merge(u, on=['user_id', 'email'], how='left', suffixes=('', '_dup'))
-            
-            # Joins to Charts Data (Using INNER join to restrict to 203 active employees)
+            # Join Title Cased columns back to UD (Employee dimension: emp_key = row position)
+            emp = ud.merge(u, on=['user_id', 'email'], how='left', suffixes=('', '_dup')).reset_index(drop=True)
+            emp['emp_key'] = np.arange(len(emp), dtype=np.int32)
+            self.DF['users_details'] = emp
+            keys = emp[['user_id', 'emp_key']]
+
+            # Narrow Facts: only an integer emp_key (+ user_id) is joined in, attributes are resolved
+            # from the dimension for displayed rows (INNER join restricts to the active employees)
             for k in ['leave_applications', 'attendance', 'leave_balance']:
                 if k in self.DF and not self.DF[k].empty:
                     df_target = self.DF[k]
                     id_col = 'User Id' if k == 'leave_applications' else ('user_id' if 'user_id' in df_target.columns else ('EmployeeId' if 'EmployeeId' in df_target.columns else None))
                     
                     if id_col and id_col in df_target.columns:
-                        df_target = df_target.drop(columns=[c for c in u.columns if c in df_target.columns and c != id_col and c != 'email'], errors='ignore')
-                        self.DF[k] = df_target.merge(u, left_on=id_col, right_on="user_id", how="inner")
+                        df_target = df_target.drop(columns=[c for c in u.columns if c in df_target.columns and c != id_col], errors='ignore')
+                        self.DF[k] = df_target.merge(keys, left_on=id_col, right_on="user_id", how="inner")
                     elif 'Employee Name' in df_target.columns:
                         # Fallback for leave_balance using exact name join
-                        self.DF[k] = df_target.merge(u, left_on='Employee Name', right_on='employee_name', how='inner')
+                        names = keys.assign(employee_name=emp['employee_name'])
+                        self.DF[k] = df_target.merge(names, left_on='Employee Name', right_on='employee_name', how='inner').drop(columns='employee_name')
 
-        # Dates & Keys
+        # Dates & Keys (Facts sorted by their period date so any period is a set of row slices)
         for k in ['attendance', 'leave_applications']:
             if not self.DF[k].empty:
                 d_col = 'attendance_date' if k == 'attendance' else 'Leave Application Date'
                 if d_col in self.DF[k].columns:
                     self.DF[k]['dt'] = pd.to_datetime(self.DF[k][d_col], errors='coerce')
-                    # Use 'from_date' for leave applications YM_KEY if available for better period alignment
-                    dt_col = 'from_date' if 'from_date' in self.DF[k].columns else 'dt'
-                    self.DF[k]['YM_KEY'] = pd.to_datetime(self.DF[k][dt_col]).dt.year.astype(str) + "_" + pd.to_datetime(self.DF[k][dt_col]).dt.month_name()
+                    # Use 'from_date' for leave applications period if available for better period alignment
+                    p_col = 'from_date' if 'from_date' in self.DF[k].columns else 'dt'
+                    self.DF[k][p_col] = pd.to_datetime(self.DF[k][p_col], errors='coerce')
+                    self.DF[k] = self.DF[k].sort_values(p_col, kind='stable', na_position='last').reset_index(drop=True)
+                    self.index_period(k, self.DF[k][p_col])
+                    self.DF[k]['date_key'] = self.Period[k]['day']
+                    # Last day covered by each leave (date_key..end_key is the leave interval)
+                    if 'to_date' in self.DF[k].columns: self.DF[k]['end_key'] = day_key(self.DF[k]['to_date'])
 
         # Hierarchy for Slicer (Same logic)
         if not self.DF['date_table'].empty:
             d = self.DF['date_table'].copy()
-            d['dt'] = pd.to_datetime(d['Date'], errors='coerce').dropna()
-            d['YM_KEY'] = d['dt'].dt.year.astype(str) + "_" + d['dt'].dt.month_name()
+            d['dt'] = pd.to_datetime(d['Date'], errors='coerce')
             d['Year'] = d['dt'].dt.year.astype(str)
             d['Qtr'] = "Qtr " + d['dt'].dt.quarter.astype(str)
             d['Month'] = d['dt'].dt.month_name()
-            d = d.sort_values('dt')
+            d = d.dropna(subset=['dt']).sort_values('dt').reset_index(drop=True)
             self.DF['date_table'] = d
+            self.index_period('date_table', d['dt'])
+            d['date_key'] = self.Period['date_table']['day']
             for _, r in d[['Year', 'Qtr', 'Month']].drop_duplicates().iterrows():
                 y, q, m = r['Year'], r['Qtr'], r['Month']
                 if y not in self.Tree: self.Tree[y] = {}
@@ -120,13 +372,20 @@ class DashboardData:
                 except: pass
             self.DF['alloc_mapped'] = pd.DataFrame(flattened).drop_duplicates()
 
+        # Dictionary Encoding (after the joins, so every category is present in its table)
+        for t, cols in CATEGORICAL_COLUMNS.items():
+            df = self.DF.get(t, pd.DataFrame())
+            for col in cols:
+                if col in df.columns: df[col] = df[col].astype('category')
+
         # Slicer Lists
         ud = self.DF.get('users_details', pd.DataFrame())
         pdm = self.DF.get('projects_details_mapped', pd.DataFrame())
         
-        # Helper to get unique sorted list safely
+        # Helper to get unique sorted list safely (categories are already the sorted uniques)
         def get_list(df, col):
             if df.empty or col not in df.columns: return []
+            if isinstance(df[col].dtype, pd.CategoricalDtype): return df[col].cat.categories.tolist()
             return sorted(df[col].dropna().unique().tolist())
 
         self.Lists = {
@@ -141,14 +400,1082 @@ class DashboardData:
             'AT': [str(x).title() for x in get_list(self.DF.get('attendance', pd.DataFrame()), 'mode_of_attendance')]
         }
 
+    def index_period(self, name, dates):
+        """Integer year-month and day keys of a table already sorted by `dates`."""
+        d = pd.to_datetime(dates, errors='coerce')
+        if d.dt.tz is not None: d = d.dt.tz_localize(None)
+        ok = d.notna().to_numpy()
+        ym = np.full(len(d), NO_PERIOD, dtype=np.int64)
+        ym[ok] = (d.dt.year * 12 + d.dt.month - 1).to_numpy()[ok]
+        self.Period[name] = {'ym': ym, 'day': day_key(d)}
+
+    def months_for(self, y, q, m):
+        """Year-month keys selected by the Period slicer (None = All Time)."""
+        if y == "All" or not y: return None
+        if q != "All" and q in self.Tree.get(y, {}):
+            sel_m = m if (m and len(m) > 0) else self.Tree[y][q]
+        else:
+            sel_m = [mon for qtr in self.Tree.get(y, {}) for mon in self.Tree[y][qtr]]
+        return [ym_key(y, MONTH_NUM[mon]) for mon in sel_m if mon in MONTH_NUM]
+
+    def period_slices(self, name, months):
+        """Row slices (lo, hi) of table `name` falling in the given year-month keys, found by
+        binary search. Returns None when the table has no period index."""
+        p = self.Period.get(name)
+        return None if p is None else month_slices(p['ym'], months)
+
+    def date_slice(self, name, start, end):
+        """Row slice (lo, hi) of table `name` dated within [start, end] (inclusive days)."""
+        day = self.Period[name]['day']
+        lo = np.datetime64(pd.Timestamp(start).date(), 'D').astype(np.int64)
+        hi = np.datetime64(pd.Timestamp(end).date(), 'D').astype(np.int64)
+        return np.searchsorted(day, lo, 'left'), np.searchsorted(day, hi, 'right')
+
+    def build_cubes(self):
+        """Pre-aggregated count tables, stored and indexed like the facts they summarize."""
+        att, dt = self.DF.get('attendance', pd.DataFrame()), self.DF.get('date_table', pd.DataFrame())
+        if att.empty or dt.empty or 'date_key' not in att.columns or 'presence_type' not in att.columns: return
+
+        # Daily Presence: attendance rows per working day x presence type x employee x row-level slicers
+        working = dt.loc[dt['IsWorkingDay'] == 1, 'date_key'].to_numpy()
+        a = att[np.isin(att['date_key'].to_numpy(), working)]
+        presence = a['presence_type']
+        blank = presence.isna() | (presence == '')
+        if isinstance(presence.dtype, pd.CategoricalDtype) and 'On Leave' not in presence.cat.categories:
+            presence = presence.cat.add_categories('On Leave')
+        keys = ['date_key', 'presence_type', 'emp_key'] + [c for c in ('workflow_state', 'mode_of_attendance') if c in a.columns]
+        cube = a.assign(presence_type=presence.mask(blank, 'On Leave')).groupby(keys, observed=True, dropna=False).size()
+        cube = cube[cube > 0].reset_index(name='Count')
+        self.DF['daily_presence'] = cube
+        self.index_period('daily_presence', pd.to_datetime(cube['date_key'], unit='D'))
+
+        # Monthly WFH: distinct WFH days and attendance rows per employee-month, for every combination
+        # of the row-level slicers (a value or its "All" roll-up), so any slicer state reads exact counts
+        ym = self.Period['attendance']['ym']
+        ok = ym != NO_PERIOD
+        a = att[ok]
+        base = pd.DataFrame({'emp_key': a['emp_key'].to_numpy(), 'ym': ym[ok], 'date_key': a['date_key'].to_numpy(),
+                             'wfh': (a['presence_type'] == 'Work From Home').to_numpy()})
+        cols = []
+        for key, col in ROW_SLICERS.items():
+            if col not in a.columns: continue
+            vals = a[col].astype(str).str.title() if SLICER_DIMS[key][1] else a[col].astype(object)
+            base[col] = vals.to_numpy()
+            cols.append(col)
+        grouping_sets = [[]] + [[c] for c in cols] + ([cols] if len(cols) > 1 else [])
+        parts = []
+        for gs in grouping_sets:
+            keys = ['emp_key', 'ym'] + gs
+            part = base.groupby(keys, dropna=False).size().rename('rows').to_frame()
+            part['wfh_days'] = base[base['wfh']].groupby(keys, dropna=False)['date_key'].nunique()
+            parts.append(part.reset_index().assign(**{c: "All" for c in cols if c not in gs}))
+        wfh = pd.concat(parts, ignore_index=True).fillna({'wfh_days': 0}).sort_values('ym', kind='stable', ignore_index=True)
+        months = pd.to_datetime(pd.DataFrame({'year': wfh['ym'] // 12, 'month': wfh['ym'] % 12 + 1, 'day': 1}))
+        wfh['Month_Year'] = months.dt.strftime('%b %Y').astype('category')
+        for c in cols: wfh[c] = wfh[c].astype('category')
+        self.DF['monthly_wfh'] = wfh
+        self.index_period('monthly_wfh', months)
+
+        # Office Hours: sum & count of WFO working hours per employee-month x row-level slicers x
+        # row bucket; sums and counts add up exactly over any set of months, slicers or buckets
+        if 'working_hours' not in att.columns: return
+        a = att[ok & (att['presence_type'] == 'Work From Office').to_numpy() & att['working_hours'].notna().to_numpy()]
+        hrs = pd.DataFrame({'emp_key': a['emp_key'].to_numpy(), 'ym': self.Period['attendance']['ym'][a.index.to_numpy()],
+                            'Office Hrs Bucket': hours_bucket(a['working_hours']), 'hours': a['working_hours'].astype(float).to_numpy()})
+        keys = ['emp_key', 'ym'] + cols + ['Office Hrs Bucket']
+        for c in cols: hrs[c] = a[c].to_numpy()
+        hrs = hrs.groupby(keys, observed=True, dropna=False)['hours'].agg(hours_sum='sum', hours_count='count').reset_index()
+        hrs = hrs.sort_values('ym', kind='stable', ignore_index=True)
+        for c in cols: hrs[c] = hrs[c].astype(a[c].dtype)
+        self.DF['office_hours'] = hrs
+        self.index_period('office_hours', pd.to_datetime(pd.DataFrame({'year': hrs['ym'] // 12, 'month': hrs['ym'] % 12 + 1, 'day': 1})))
+
+    def build_olap(self):
+        """OLAP cubes (see Cube) the chart queries roll up: leave applications, days on leave, and
+        the daily presence, monthly WFH and office-hours tables built by build_cubes."""
+        n_emp = len(self.DF.get('users_details', pd.DataFrame()))
+        la = self.DF.get('leave_applications', pd.DataFrame())
+        if not la.empty and 'dt' in la.columns and 'leave_type' in la.columns:
+            # Leave Applications: count, days & hours per employee x period month (from date) x
+            # application month x leave type x status x category
+            days = la['Total Leave Days'] if 'Total Leave Days' in la.columns else la['total_leave_days']
+            h_col = 'Total Leave hrs' if 'Total Leave hrs' in la.columns else ('total_leave_hrs' if 'total_leave_hrs' in la.columns else None)
+            hours = la[h_col].fillna(0).astype(float) if h_col else days.fillna(0).astype(float) * 8
+            cells = pd.DataFrame({'emp_key': la['emp_key'], 'ym': self.Period['leave_applications']['ym'],
+                                  'app_ym': (la['dt'].dt.year * 12 + la['dt'].dt.month - 1).astype('Int64'),
+                                  'leave_type': la['leave_type'], 'status': la['status'],
+                                  'category': la.get('Leave Application Category'),
+                                  'days': days.fillna(0).astype(float), 'hours': hours})
+            keys = ['emp_key', 'ym', 'app_ym', 'leave_type', 'status', 'category']
+            cells = cells.groupby(keys, observed=True, dropna=False).agg(n=('days', 'size'), days=('days', 'sum'), hours=('hours', 'sum'))
+            cells = cells.reset_index().sort_values('ym', kind='stable', ignore_index=True)
+            self.Cube['leaves'] = Cube(cells, keys[2:], ['n', 'days', 'hours'], n_emp, slicers={'lt': 'leave_type'})
+
+            # Days on Leave: distinct employee x day covered by Approved/Open leaves, per period month
+            # and leave type of the covering applications (the slicers selecting them)
+            active = la['status'].isin(ACTIVE_STATUS).to_numpy()
+            occ = leave_occupancy(la[active].assign(ym=self.Period['leave_applications']['ym'][active]), 'ym', 'leave_type')
+            self.Cube['leave_days'] = Cube(occ.sort_values('ym', kind='stable', ignore_index=True), ['date_key', 'leave_type'], [], n_emp,
+                                           slicers={'lt': 'leave_type'})
+
+        # Attendance: the pre-aggregated tables are already base-grain cells sorted by period (office
+        # hours count distinct employees per bucket across months, so they keep no apex roll-up)
+        for name, table, dims, measures, totals, apex in (
+                ('presence', 'daily_presence', ['date_key', 'presence_type'], ['Count'], False, True),
+                ('wfh', 'monthly_wfh', ['month'], ['rows', 'over_9'], True, True),
+                ('office_hours', 'office_hours', ['Office Hrs Bucket'], ['hours_sum', 'hours_count'], False, False)):
+            df = self.DF.get(table, pd.DataFrame())
+            if df.empty: continue
+            slicers = {k: c for k, c in ROW_SLICERS.items() if c in df.columns}
+            cells = df.assign(ym=self.Period[table]['ym'])
+            # Monthly WFH: one cell per employee-month (per slicer combination), bucketed by the > 9 days rule
+            if table == 'monthly_wfh': cells = cells.assign(month=cells['ym'], over_9=(cells['wfh_days'] > 9).astype(float))
+            self.Cube[name] = Cube(cells, dims + list(slicers.values()), measures, n_emp, slicers=slicers, totals=totals, apex=apex)
+
+    def build_indexes(self):
+        """Per table, maps every slicer value to the sorted row positions holding it."""
+        for t in INDEXED_TABLES:
+            df = self.DF.get(t, pd.DataFrame())
+            self.Index[t] = {}
+            if df.empty: continue
+            for key, (col, titled) in SLICER_DIMS.items():
+                vals = self.resolve(df, col)
+                if vals is None: continue
+                vals = vals.astype(str).str.title() if titled else vals
+                self.Index[t][key] = vals.groupby(vals.to_numpy(), sort=False).indices
+
+    def resolve(self, df, col):
+        """Column `col` of `df`, looked up in the employee dimension by emp_key when the table
+        does not carry it (None when neither has it)."""
+        if col in df.columns: return df[col]
+        emp = self.DF.get('users_details', pd.DataFrame())
+        if 'emp_key' not in df.columns or col not in emp.columns: return None
+        return pd.Series(emp[col].array.take(df['emp_key'].to_numpy()), index=df.index, name=col)
+
+    def attach(self, df, *cols):
+        """`df` with employee attributes `cols` resolved for its rows only."""
+        return df.assign(**{c: self.resolve(df, c) for c in cols})
+
+    def build_members(self):
+        """Employees (emp_keys) behind the indirect slicers: attendance mode -> employees with such
+        entries, and (project, project manager) -> employees allocated to matching projects
+        ("All" = any)."""
+        self.Members = {'at': {}, 'proj_pm': {}}
+        att = self.DF.get('attendance', pd.DataFrame())
+        if not att.empty and 'mode_of_attendance' in att.columns:
+            modes = att['mode_of_attendance'].astype(str).str.title()
+            self.Members['at'] = {k: pd.unique(v) for k, v in att['emp_key'].groupby(modes.to_numpy(), sort=False)}
+
+        pdm = self.DF.get('projects_details_mapped', pd.DataFrame())
+        am = self.DF.get('alloc_mapped', pd.DataFrame())
+        if pdm.empty or am.empty: return
+        p = pd.DataFrame({'proj_id': pdm['proj_id'],
+                          'proj': pdm['project_name'].astype(str).str.title(),
+                          'pm': pdm['project_manager'].astype(str).str.title()})
+        keys = self.DF['users_details'][['user_id', 'emp_key']]
+        pu = p.merge(am[['proj_id', 'user_id']], on='proj_id').merge(keys, on='user_id')
+        for keys in (['proj', 'pm'], ['proj'], ['pm']):
+            for k, v in pu.groupby(keys, sort=False)['emp_key']:
+                k = dict(zip(keys, k))
+                self.Members['proj_pm'][(k.get('proj', "All"), k.get('pm', "All"))] = pd.unique(v)
+
+    def members(self, key, val):
+        """emp_keys for an indirect slicer value (empty when nothing matches)."""
+        return self.Members.get(key, {}).get(val, NO_ROWS)
+
+    def employees(self, sel, own=()):
+        """Employees (bool mask over emp_keys) selected by the employee-level slicer values in `sel`,
+        the indirect attendance-type (unless listed in `own`, the caller's rows carrying their own)
+        and project slicers included: the employees select_rows keeps rows of."""
+        keep = np.ones(len(self.DF.get('users_details', pd.DataFrame())), dtype=bool)
+        hits = [idx.get(sel[key], NO_ROWS) for key, idx in self.Index.get('users_details', {}).items()
+                if sel.get(key, "All") != "All"]  # Row positions of the employee dimension = emp_keys
+        if 'at' not in own and sel.get('at', "All") != "All" and self.Members.get('at'):
+            hits.append(self.members('at', sel['at']))
+        proj, pm = sel.get('proj', "All"), sel.get('pm', "All")
+        if (proj != "All" or pm != "All") and self.Members.get('proj_pm'):
+            hits.append(self.members('proj_pm', (proj, pm)))
+        for emps in hits:
+            hit = np.zeros_like(keep)
+            hit[emps] = True
+            keep &= hit
+        return keep
+
+    def dims(self, name):
+        """Slicer keys that can select rows of table `name`: its indexed dimensions, plus the indirect
+        attendance-type and project slicers when its rows carry employees (see select_rows)."""
+        keys = set(self.Index.get(name, {}))
+        if 'emp_key' in self.DF.get(name, pd.DataFrame()).columns:
+            if self.Members.get('at'): keys.add('at')
+            if self.Members.get('proj_pm'): keys.update(('proj', 'pm'))
+        return keys
+
+    def build_lookups(self):
+        """Drill-through indexes: leave rows per application month and per employee, emp_keys per
+        normalized employee name, and the longest leave span (bounds the rows a day can fall in)."""
+        la = self.DF.get('leave_applications', pd.DataFrame())
+        if not la.empty and 'dt' in la.columns:
+            d = la['dt'].dt.tz_localize(None) if la['dt'].dt.tz is not None else la['dt']
+            ok = d.notna().to_numpy()
+            app_ym = np.full(len(la), NO_PERIOD, dtype=np.int64)
+            app_ym[ok] = (d.dt.year * 12 + d.dt.month - 1).to_numpy()[ok]
+            self.Lookup['leave_applications'] = {
+                'app_ym': pd.Series(app_ym).groupby(app_ym, sort=False).indices,
+                'emp_key': la['emp_key'].groupby(la['emp_key'].to_numpy(), sort=False).indices,
+            }
+            if 'end_key' in la.columns:
+                start, end = la['date_key'].to_numpy(), la['end_key'].to_numpy()
+                valid = (start != NO_PERIOD) & (end != NO_PERIOD) & (end >= start)
+                self.LeaveSpan = int((end[valid] - start[valid]).max()) if valid.any() else 0
+        emp = self.DF.get('users_details', pd.DataFrame())
+        if not emp.empty and 'employee_name_t' in emp.columns:
+            names = emp['employee_name_t'].astype(str).str.strip().str.lower()
+            keys = emp['emp_key'].to_numpy()
+            self.Lookup['users_details'] = {'name': {k: keys[v] for k, v in names.groupby(names.to_numpy(), sort=False).indices.items()}}
+
+    def lookup(self, name, key, val):
+        """Sorted row positions of table `name` whose drill key `key` equals `val`."""
+        return self.Lookup.get(name, {}).get(key, {}).get(val, NO_ROWS)
+
+    def leaves_on(self, day, last=None):
+        """Positions of the leave applications whose interval covers day number `day` (or overlaps days
+        `day`..`last`); only rows starting within the longest leave span before it are scanned."""
+        la = self.DF.get('leave_applications', pd.DataFrame())
+        if la.empty or 'end_key' not in la.columns: return NO_ROWS
+        start = self.Period['leave_applications']['day']
+        lo, hi = np.searchsorted(start, day - self.LeaveSpan, 'left'), np.searchsorted(start, day if last is None else last, 'right')
+        end = la['end_key'].to_numpy()[lo:hi]
+        return lo + np.flatnonzero((end >= day) & (end != NO_PERIOD))
+
+    def rows(self, name, pos):
+        """Rows of table `name` at positions `pos` (the shared table itself when pos is None)."""
+        df = self.DF.get(name, pd.DataFrame())
+        return df if pos is None else df.take(pos)
+
+    def select(self, name, sel, months=None):
+        """Row positions of table `name` matching the slicer values in `sel` and the year-month
+        keys in `months` (None = all rows). Dimensions the table is not indexed on are ignored."""
+        pos = None
+        for key, val in sel.items():
+            idx = self.Index.get(name, {}).get(key)
+            if val == "All" or idx is None: continue
+            p = idx.get(val, NO_ROWS)
+            pos = p if pos is None else np.intersect1d(pos, p, assume_unique=True)
+            if len(pos) == 0: return pos
+        slices = self.period_slices(name, months) if months is not None else None
+        if slices is not None:
+            if pos is None:
+                pos = np.concatenate([np.arange(lo, hi) for lo, hi in slices] or [NO_ROWS])
+            else:
+                pos = np.concatenate([pos[np.searchsorted(pos, lo):np.searchsorted(pos, hi)] for lo, hi in slices] or [NO_ROWS])
+        return pos
+
 DB = DashboardData()
 
+# ====================================================
+#   QUERY LAYER
+# ====================================================
+# Chart inputs are pure functions of (data version, filter state), so they are computed once
+# per process and shared by every session. Results are read-only: renders derive from them.
+FilterState = namedtuple('FilterState', ['months', 'dims'])
+
+def make_state(year, qtr, month, **slicers):
+    """Normalized, hashable filter state: sorted year-month keys (None = All Time) and the
+    (key, value) pairs of the slicers that are not "All"."""
+    months = DB.months_for(year, qtr, month)
+    dims = tuple((k, slicers[k]) for k in FILTER_KEYS if slicers.get(k, "All") != "All")
+    return FilterState(tuple(sorted(set(months))) if months is not None else None, dims)
+
+def dim(state, key):
+    return dict(state.dims).get(key, "All")
+
+def state_keys(name):
+    """Slicer keys (in FILTER_KEYS order) that apply to table, intermediate or query `name`."""
+    keys = set().union(*(DB.dims(t) for t in SOURCES.get(name, [name])))
+    return tuple(k for k in FILTER_KEYS if k in keys)
+
+def narrow(name, state):
+    """`state` without the slicers that cannot affect `name`, so results (and their cache entries) are
+    shared across changes of unrelated slicers."""
+    keys = state_keys(name)
+    return state._replace(dims=tuple(d for d in state.dims if d[0] in keys))
+
+def select_rows(name, state):
+    """Row positions of table `name` selected by `state` (None = all rows)."""
+    pos = DB.select(name, dict(state.dims), state.months)
+    df = DB.rows(name, pos)
+    if 'emp_key' not in df.columns or df.empty: return pos
+    mask = None
+    try:
+        # Indirect Attendance Type (Tables without their own attendance mode)
+        at_val = dim(state, 'at')
+        if at_val != "All" and 'mode_of_attendance' not in df.columns and DB.Members['at']:
+            # Filter by users who have entries for this attendance type
+            mask = df['emp_key'].isin(DB.members('at', at_val)).to_numpy()
+
+        # Project Filters (Using Allocation mapping)
+        proj, pm = dim(state, 'proj'), dim(state, 'pm')
+        if (proj != "All" or pm != "All") and DB.Members['proj_pm']:
+            p_rows = df['emp_key'].isin(DB.members('proj_pm', (proj, pm))).to_numpy()
+            mask = p_rows if mask is None else (mask & p_rows)
+    except Exception as e: print(f"Filter Error: {e}")
+    if mask is None: return pos
+    return np.flatnonzero(mask) if pos is None else pos[mask]
+
+class ResultCache:
+    """Process-wide LRU cache bounded by an estimate of the cached bytes. Concurrent requests
+    for a key being computed wait for that computation instead of repeating it."""
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.items = OrderedDict()
+        self.sizes = {}
+        self.total = 0
+        self.pending = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def nbytes(v):
+        if isinstance(v, pd.DataFrame): return int(v.memory_usage(index=True).sum())
+        if isinstance(v, (pd.Series, pd.Index)): return int(v.memory_usage(index=True))
+        if isinstance(v, np.ndarray): return v.nbytes
+        if isinstance(v, dict): return sum(ResultCache.nbytes(x) for x in v.values()) + sys.getsizeof(v)
+        if isinstance(v, (list, tuple)): return sum(ResultCache.nbytes(x) for x in v) + sys.getsizeof(v)
+        return sys.getsizeof(v)
+
+    def get_or_compute(self, key, fn):
+        while True:
+            with self.lock:
+                if key in self.items:
+                    self.items.move_to_end(key)
+                    return self.items[key]
+                wait = self.pending.get(key)
+                if wait is None:
+                    done = self.pending[key] = threading.Event()
+                    break
+            wait.wait()  # Another caller is computing this key; re-check once it finishes
+        try:
+            val = fn()
+            self.put(key, val)
+            return val
+        finally:
+            with self.lock: del self.pending[key]
+            done.set()
+
+    def put(self, key, val):
+        size = self.nbytes(val)
+        if size > self.max_bytes: return
+        with self.lock:
+            if key in self.items: self.total -= self.sizes.pop(key)
+            self.items[key] = val
+            self.sizes[key] = size
+            self.total += size
+            while self.total > self.max_bytes:
+                old, _ = self.items.popitem(last=False)
+                self.total -= self.sizes.pop(old)
+
+CACHE = ResultCache(RESULT_CACHE_BYTES)
+
+class ComputeClient:
+    """Connections (one per thread) to the shared compute service, which owns the data and the result
+    cache for every web worker on the host. Requests carry the data version; any failure (service
+    down, other key or data version) reports not-ok and the caller computes in-process instead."""
+    def __init__(self, address):
+        self.address = address
+        self.local = threading.local()
+        self.retry_at = 0.0
+
+    def connect(self):
+        """New authenticated connection to the service (a stalled handshake times out like a reply)."""
+        conn = Client(self.address, family='AF_UNIX')
+        try:
+            if not conn.poll(COMPUTE_TIMEOUT_S): raise TimeoutError(f"no handshake in {COMPUTE_TIMEOUT_S}s")
+            answer_challenge(conn, COMPUTE_KEY)
+            deliver_challenge(conn, COMPUTE_KEY)
+        except BaseException:
+            conn.close()
+            raise
+        return conn
+
+    def call(self, fn, *args):
+        """(True, result) of service function `fn`, or (False, None) when it cannot answer."""
+        if time.monotonic() < self.retry_at: return False, None
+        conn = getattr(self.local, 'conn', None)
+        try:
+            if conn is None: conn = self.local.conn = self.connect()
+            conn.send((fn, args, DB.Version))
+            if not conn.poll(COMPUTE_TIMEOUT_S): raise TimeoutError(f"no reply in {COMPUTE_TIMEOUT_S}s")
+            status, res = conn.recv()
+        except (OSError, EOFError, AuthenticationError) as e:
+            print(f"Compute service unavailable ({e}); computing in-process for {COMPUTE_RETRY_S}s")
+            if conn is not None: conn.close()  # A late reply must not answer this thread's next request
+            self.local.conn = None
+            self.retry_at = time.monotonic() + COMPUTE_RETRY_S
+            return False, None
+        if status == 'stale':
+            # The service serves other data (this worker's is older and never reloads): stop asking for a while
+            print(f"Compute service serves data version {res}, not {DB.Version}; computing in-process for {COMPUTE_RETRY_S}s")
+            self.retry_at = time.monotonic() + COMPUTE_RETRY_S
+        elif status != 'ok': print(f"Compute service: {status} {res}")
+        return status == 'ok', res
+
+if COMPUTE_SOCKET and not COMPUTE_KEY: print("DASHBOARD_COMPUTE_KEY is not set; not using the compute service")
+SERVICE = ComputeClient(COMPUTE_SOCKET) if COMPUTE_SOCKET and COMPUTE_KEY else None
+
+def row_positions(name, state):
+    """Cached row positions of table `name` selected by `state` (None = all rows)."""
+    state = narrow(name, state)
+    if SERVICE:
+        ok, res = SERVICE.call('row_positions', name, tuple(state))
+        if ok: return res
+    return CACHE.get_or_compute((DB.Version, state, 'rows', name), lambda: select_rows(name, state))
+
+def filtered(name, state):
+    """Rows of table `name` selected by `state` (shared, read-only frame)."""
+    if DB.DF.get(name, pd.DataFrame()).empty: return pd.DataFrame()
+    return DB.rows(name, row_positions(name, state))
+
+def drill_rows(name, state, pos):
+    """Rows of table `name` at the sorted positions `pos` that `state` also selects, so a
+    drill-through touches only the rows its click resolves to."""
+    if DB.DF.get(name, pd.DataFrame()).empty: return pd.DataFrame()
+    sel = row_positions(name, state)
+    if sel is not None: pos = np.intersect1d(pos, sel, assume_unique=True)
+    return DB.rows(name, pos)
+
+def cube_cells(name, state, **where):
+    """Cells of cube `name` selected by `state` (plus the labels accepted in `where`, see Cube.select)."""
+    cube, sel = DB.Cube[name], dict(state.dims)
+    return cube.select(sel, state.months, DB.employees(sel, own=cube.slicers), **where)
+
+def per_employee_attr(values, col):
+    """Employee-level `values` (leading axis over emp_keys) summed per value of employee attribute
+    `col`: (attribute values, sums); employees without a value are left out."""
+    attr = DB.DF['users_details'][col]
+    codes = attr.cat.codes.to_numpy()
+    out = np.zeros((len(attr.cat.categories),) + values.shape[1:])
+    np.add.at(out, codes[codes >= 0], values[codes >= 0])
+    return attr.cat.categories, out
+
+def has_attendance(state):
+    """Whether `state` selects any (dated) attendance row, read off the monthly WFH cube's cells."""
+    return 'wfh' in DB.Cube and len(cube_cells('wfh', state)) > 0
+
+def only_active(df):
+    """Approved/Open leave applications (the status rule every leave chart counts)."""
+    return df[df['status'].isin(ACTIVE_STATUS)] if not df.empty else df
+
+def monthly_wfh(state):
+    """WFH days per employee-month under `state`: the monthly WFH roll-up rows matching the
+    row-level slicers ("All" rows where a slicer is not set), bucketed by the > 9 days rule."""
+    wfh = filtered('monthly_wfh', state)
+    if wfh.empty: return wfh
+    keep = np.ones(len(wfh), dtype=bool)
+    for key, col in ROW_SLICERS.items():
+        if col in wfh.columns: keep &= (wfh[col] == dim(state, key)).to_numpy()
+    wfh = wfh[keep]
+    return wfh.assign(**{'WFH Bucket': np.where(wfh['wfh_days'] > 9, "WFH > 9", "WFH <= 9")})
+
+def availability(state):
+    """Per working day in the period: distinct employees on leave and remaining available headcount."""
+    dates = derived('dates', state)
+    dates = dates[dates['IsWorkingDay'] == 1] if not dates.empty else dates
+    total_count = int(DB.employees(dict(state.dims)).sum())
+    on_leave = pd.Series(dtype=np.int64)
+    if 'leave_days' in DB.Cube:
+        cube = DB.Cube['leave_days']
+        on_leave = pd.Series(cube.distinct(cube_cells('leave_days', state), ('date_key',)), index=cube.labels('date_key'))
+    res = pd.DataFrame({'Date': dates['dt'].dt.normalize().to_numpy(), 'date_key': dates['date_key'].to_numpy()})
+    res['Employees on Leave'] = on_leave.reindex(res['date_key'], fill_value=0).to_numpy()
+    res['Available Employees'] = (total_count - res['Employees on Leave']).clip(lower=0)
+    return {'days': res, 'total_count': total_count}
+
+# Intermediates shared by several charts: built once per (data version, filter state)
+DERIVED = {
+    'dates': lambda state: filtered('date_table', state),
+    'availability': availability,
+    'monthly_wfh': monthly_wfh,
+}
+
+def derived(name, state):
+    state = narrow(name, state)
+    return CACHE.get_or_compute((DB.Version, state, 'derived', name), lambda: DERIVED[name](state))
+
+def agg_plt_trend(state):
+    if 'leaves' not in DB.Cube: return {}
+    cube = DB.Cube['leaves']
+
+    # 0-1. Approved/Open applications, filtered by application month strictly as well
+    where = {'status': ACTIVE_STATUS}
+    if state.months is not None: where['app_ym'] = state.months
+    pos = cube_cells('leaves', state, **where)
+    if len(pos) == 0: return {}
+
+    # Determine sorted month order from calendar table (kept sorted by date) for consistent X-axis
+    dt_df = derived('dates', state)
+    month_order = dt_df['dt'].dt.strftime('%b %Y').unique().tolist() if not dt_df.empty else []
+
+    # Applications per application month x category
+    counts = cube.rollup(pos, ('app_ym', 'category'), 'n')
+    ym, cat = np.nonzero(counts)
+    seen = {(month_label(int(cube.labels('app_ym')[i])), cube.labels('category')[j]): int(counts[i, j]) for i, j in zip(ym, cat)}
+
+    # Ensure all months in month_order are present, even if zero
+    if month_order:
+        all_cats = ["Applied Before Availing", "Applied Post Availing"]
+        rows = [(m, k, seen.get((m, k), 0)) for m in month_order for k in all_cats]
+    else:
+        rows = [(m, k, n) for (m, k), n in seen.items()]
+    c = pd.DataFrame(rows, columns=['Month_Year', 'Leave Application Category', 'Count'])
+    return {'c': c, 'month_order': month_order}
+
+def agg_plt_util(state):
+    if 'leaves' not in DB.Cube: return {}
+    cube = DB.Cube['leaves']
+
+    # 1. Approved/Open applications, filtered by application month strictly
+    where = {'status': ACTIVE_STATUS}
+    if state.months is not None: where['app_ym'] = state.months
+    pos = cube_cells('leaves', state, **where)
+    if len(pos) == 0: return {}
+
+    # 2. Total Leave Hours per application month (hours, or 8 per leave day when the data has none)
+    seen = cube.rollup(pos, ('app_ym',), 'n') > 0
+    res_leave = pd.DataFrame({'Month_Year': [month_label(int(ym)) for ym in cube.labels('app_ym')[seen]],
+                              'Total Leave Hours': cube.rollup(pos, ('app_ym',), 'hours')[seen]})
+
+    # 3. Monthly Capacity calculation (Active EMP * 8 * Working Days)
+    dt_df = derived('dates', state)
+    if dt_df.empty: return {}
+
+    # Map date_table to Month_Year
+    dt_df = dt_df.assign(Month_Year=dt_df['dt'].dt.strftime('%b %Y'))
+    res_wd = dt_df[dt_df['IsWorkingDay'] == 1].groupby('Month_Year').size().reset_index(name='Working Days')
+
+    # Active Employees (Filtered by current slicers)
+    active_emp_count = int(DB.employees(dict(state.dims)).sum())
+
+    # 4. Merge and Calculate Impact (Left join from Working Day calendar to keep all months)
+    res = res_wd.merge(res_leave, on='Month_Year', how='left').fillna(0)
+    res['Active EMP'] = active_emp_count
+    res['Total Available Org Hours'] = res['Active EMP'] * 8 * res['Working Days']
+    res['Leave Impact %'] = (res['Total Leave Hours'] / res['Total Available Org Hours'].replace(0, 1)) * 100
+
+    # Determine sorted month order from calendar data (kept sorted by date) for X-axis
+    month_order = dt_df['Month_Year'].unique().tolist()
+    return {'res': res, 'month_order': month_order}
+
+def agg_plt_top(state):
+    if 'leaves' not in DB.Cube or len(cube_cells('leaves', state)) == 0: return {}
+    cube = DB.Cube['leaves']
+
+    # 1. Filter: Valid Status (Strictly following DAX Logic)
+    # DAX Logic: Status IN {"Approved", "Open"}
+    pos = cube_cells('leaves', state, status=ACTIVE_STATUS)
+    if len(pos) == 0: return {'msg': "No Approved/Open Leaves Found"}
+
+    # 2. Aggregate Metrics per employee name (Matching Original Logic)
+    names, count = per_employee_attr(cube.rollup(pos, ('emp_key',), 'n'), 'employee_name_t')
+    _, days = per_employee_attr(cube.rollup(pos, ('emp_key',), 'days'), 'employee_name_t')
+    seen = count > 0
+    top = pd.DataFrame({'employee_name_t': pd.Categorical(names[seen], categories=names),
+                        "Leave Instances": count[seen].astype(np.int64), "Leave Days": days[seen]})
+
+    # 3. Select Top 10 Employees with highest Leave Instances
+    top = top.sort_values(['Leave Instances', 'Leave Days'], ascending=[False, False]).head(10)
+
+    # 4. Melt for Stacked Bar Chart
+    m = top.melt(id_vars='employee_name_t', value_vars=['Leave Instances', 'Leave Days'], 
+                 var_name='Metric', value_name='Value')
+    return {'top': top, 'm': m}
+
+def agg_plt_avail(state):
+    # 1. Get Base Date Range from date_table and FILTER FOR WORKING DAYS ONLY
+    dates_df = derived('dates', state)
+    if dates_df.empty: return {'msg': "No Dates in Selected Period"}
+    dates_df = dates_df[dates_df['IsWorkingDay'] == 1]
+    if dates_df.empty: return {'msg': "No Working Days in Selected Period"}
+
+    # 2-5. Distinct employees on leave per working day (leave intervals expanded per person & day)
+    avail = derived('availability', state)
+    res, total_count = avail['days'].drop(columns='date_key'), avail['total_count']
+
+    # 6. Plot Side-by-Side Bars
+    # Use full "Day Month" for categorical ID (separate months), but override display with day only.
+    # Long periods roll up to weeks / months (average headcount per working day of the bar).
+    grain = time_grain(res['Date'])
+    b = grain_buckets(res['Date'], grain)[['Day', 'First', 'Last', 'DayLabel', 'DayNum']]
+    res = res.merge(b, left_on='Date', right_on='Day')
+    if grain != 'D':
+        res = res.groupby(['First', 'Last', 'DayLabel', 'DayNum'])[['Available Employees', 'Employees on Leave']].mean().round(1).reset_index()
+    res = res.assign(Date=res['First'], Date_To=res['Last'])
+
+    m = res.melt(id_vars=['Date', 'Date_To', 'DayLabel', 'DayNum'], value_vars=['Available Employees', 'Employees on Leave'], 
+                 var_name='Category', value_name='Count')
+    return {'m': m, 'total_count': total_count, 'grain': grain}
+
+def agg_plt_daily_att(state):
+    if not has_attendance(state): return {}
+
+    # Roll up the daily presence cube (working days only, blank presence = "On Leave")
+    pos = cube_cells('presence', state) if 'presence' in DB.Cube else NO_ROWS
+    if len(pos) == 0: return {'msg': "No Attendance on Working Days"}
+    cube = DB.Cube['presence']
+    counts = cube.rollup(pos, ('date_key', 'presence_type'), 'Count')
+    day, kind = np.nonzero(counts)
+    c = pd.DataFrame({'date_key': cube.labels('date_key')[day], 'Count': counts[day, kind].astype(np.int64),
+                      'presence_type': pd.Categorical.from_codes(kind, categories=cube.labels('presence_type'))})
+
+    # Create day labels once per day (rolled up to weeks / months over long periods)
+    # Use full "Day Month" for categorical ID (separate months), but override display with day only.
+    grain = time_grain(pd.to_datetime(c['date_key'].unique(), unit='D'))
+    labels = grain_buckets(pd.to_datetime(c['date_key'].unique(), unit='D'), grain)
+    c = labels.merge(c, on='date_key')
+    c = c.groupby(['First', 'Last', 'DayLabel', 'DayNum', 'presence_type'], observed=True)['Count'].sum().reset_index()
+    rank = c['presence_type'].astype(str).map({p: i for i, p in enumerate(PRESENCE_ORDER)}).fillna(len(PRESENCE_ORDER))
+    c = c.assign(rank=rank, dt_norm=c['First'], dt_to=c['Last']).sort_values(['rank', 'First'], kind='stable', ignore_index=True)
+    return {'c': c[['dt_norm', 'dt_to', 'DayLabel', 'DayNum', 'presence_type', 'Count']], 'grain': grain}
+
+def agg_plt_hrs_dist(state):
+    if not has_attendance(state): return {}
+
+    # 1-2. "Work From Office" hours, row-level bucketed (DAX logic), from the office-hours cube
+    pos = cube_cells('office_hours', state) if 'office_hours' in DB.Cube else NO_ROWS
+    if len(pos) == 0: return {'msg': "No WFO Data"}
+    cube = DB.Cube['office_hours']
+    bucket = cube.labels('Office Hrs Bucket')
+
+    # 3. Aggregate: X = Bucket, Y = Distinct Count of Employees (by name), Tooltip = Avg Hours
+    _, named = per_employee_attr(cube.rollup(pos, ('emp_key', 'Office Hrs Bucket')) > 0, 'employee_name_t')
+    seen = cube.rollup(pos, ('Office Hrs Bucket',)) > 0
+    hours_sum, hours_count = (cube.rollup(pos, ('Office Hrs Bucket',), m)[seen] for m in ('hours_sum', 'hours_count'))
+    res = pd.DataFrame({'Total_Emp_WFO': (named > 0).sum(axis=0)[seen], 'Avg_Office_Hours': hours_sum / hours_count},
+                       index=pd.CategoricalIndex(bucket[seen], categories=bucket, name='Office Hrs Bucket'))
+    res = res.reindex(pd.CategoricalIndex(HOURS_BUCKETS, name='Office Hrs Bucket')).reset_index()
+    return {'res': res}
+
+def agg_plt_wfh_comp(state):
+    # 1-3. Per Employee per Month WFH days (all employees with attendance, 0 WFH days included), bucketed (DAX logic: > 9)
+    pos = cube_cells('wfh', state) if 'wfh' in DB.Cube else NO_ROWS
+    if len(pos) == 0: return {}
+    cube = DB.Cube['wfh']
+    emps, over = cube.rollup(pos, ('month',)), cube.rollup(pos, ('month',), 'over_9')
+
+    # Chronological Sort (month keys are in order)
+    seen = emps > 0
+    month_order = [month_label(int(ym)) for ym in cube.labels('month')[seen]]
+
+    c = sorted((m, bucket, int(n)) for m, e, o in zip(month_order, emps[seen], over[seen])
+               for bucket, n in (("WFH <= 9", e - o), ("WFH > 9", o)) if n > 0)
+    c = pd.DataFrame(c, columns=['Month_Year', 'WFH Bucket', 'Distinct_Employees'])
+    return {'c': c, 'month_order': month_order}
+
+def agg_tbl_matrix(state):
+    if 'leaves' not in DB.Cube or 'department_name_t' not in DB.DF['users_details'].columns: return pd.DataFrame()
+    pos = cube_cells('leaves', state)
+    if len(pos) == 0: return pd.DataFrame()
+    cube = DB.Cube['leaves']
+
+    # Pivot by Department, Sum of days (leave types / departments with applications)
+    depts, days = per_employee_attr(cube.rollup(pos, ('emp_key', 'leave_type'), 'days'), 'department_name_t')
+    _, count = per_employee_attr(cube.rollup(pos, ('emp_key', 'leave_type'), 'n'), 'department_name_t')
+    rows, cols = count.sum(axis=0) > 0, count.sum(axis=1) > 0
+    p = pd.DataFrame(days[cols][:, rows].T, index=cube.labels('leave_type')[rows], columns=depts[cols])
+
+    # Clear index names to prevent rogue headers in some renderers
+    p.index.name = None
+    p.columns.name = None
+
+    # Add Totals
+    p.loc['Total'] = p.sum()
+    p['Total'] = p.sum(axis=1)
+
+    # Format decimals
+    p = p.map(lambda x: f"{x:.2f}" if x != 0 else "")
+
+    res = p.reset_index().rename(columns={'index': 'Leave type'})
+    return res
+
+QUERIES = {
+    'plt_trend': agg_plt_trend,
+    'plt_util': agg_plt_util,
+    'plt_top': agg_plt_top,
+    'plt_avail': agg_plt_avail,
+    'tbl_matrix': agg_tbl_matrix,
+    'plt_daily_att': agg_plt_daily_att,
+    'plt_hrs_dist': agg_plt_hrs_dist,
+    'plt_wfh_comp': agg_plt_wfh_comp,
+}
+
+def run_query(output_id, state):
+    """Cached input of chart/table `output_id` under `state`."""
+    state = narrow(output_id, state)
+    if SERVICE:
+        ok, res = SERVICE.call('run_query', output_id, tuple(state))
+        if ok: return res
+    return CACHE.get_or_compute((DB.Version, state, output_id), lambda: QUERIES[output_id](state))
+
+# Renders hand their pandas work to a bounded, process-wide thread pool, so one session's heavy query
+# does not stall the event loop (and with it every other session of the worker). The NumPy / pandas
+# kernels release the GIL; queries are read-only on DB and the cache is thread-safe.
+COMPUTE_POOL = ThreadPoolExecutor(max_workers=COMPUTE_WORKERS, thread_name_prefix='compute')
+
+async def offload(fn, *args):
+    """Awaits fn(*args) run on COMPUTE_POOL."""
+    return await asyncio.get_running_loop().run_in_executor(COMPUTE_POOL, fn, *args)
+
+# ====================================================
+#   CHARTS
+# ====================================================
+# Prebuilt chart template: plotly_white with the dashboard fonts, legend, hover labels and axis lines
+CHART_TEMPLATE = go.layout.Template(pio.templates['plotly_white'])
+CHART_TEMPLATE.layout.update(
+    margin=dict(l=10, r=10, t=30, b=40),
+    font=dict(family="Inter, sans-serif", color="#334155", size=9),
+    legend=dict(
+        orientation="h",
+        yanchor="bottom",
+        y=1.02,
+        xanchor="center",
+        x=0.5,
+        title_text='',
+        font=dict(size=8)
+    ),
+    hoverlabel=dict(
+        bgcolor="white",
+        font_size=10,
+        font_family="Inter, sans-serif"
+    )
+)
+CHART_TEMPLATE.layout.xaxis.update(showline=True, linecolor="#e2e8f0", gridcolor="#f1f5f9")
+CHART_TEMPLATE.layout.yaxis.update(showline=True, linecolor="#e2e8f0", gridcolor="#f1f5f9")
+pio.templates['dashboard'] = CHART_TEMPLATE
+
+def chart(data=(), **layout):
+    """Figure of trace dicts `data` on the dashboard template (an empty chart when there are none)."""
+    data = list(data)
+    lookups = compact_custom(data)
+    if lookups: layout['meta'] = {'custom': lookups}
+    return go.Figure(data=data, layout=dict(template=pio.templates['dashboard'], **layout))
+
+def compact_custom(data):
+    """Packs the customdata of trace dicts `data` into one typed (binary) array per trace: text and date columns
+    become integer codes into per-figure lookup lists, numbers are rounded to the 2 decimals the tooltips show.
+    Returns the lookup list of each column (None for numeric ones), or None when nothing was packed; the
+    drill-through script maps the codes back (expand_custom)."""
+    width = max((t['customdata'].shape[1] for t in data if t.get('customdata') is not None), default=0)
+    if not width: return None
+    traces = [t for t in data if t.get('customdata') is not None]
+    columns = [[pd.Series(t['customdata'][:, j]).infer_objects() for j in range(width)] for t in traces]
+    # A column is numeric only when it is numeric in every trace with points (else all its values are coded)
+    numeric = [all(c[j].empty or pd.api.types.is_numeric_dtype(c[j]) and not pd.api.types.is_bool_dtype(c[j]) for c in columns)
+               for j in range(width)]
+    lookups = [None if numeric[j] else [] for j in range(width)]
+    codes = [{} for _ in range(width)]
+    for t, trace_cols in zip(traces, columns):
+        cols = []
+        for j, col in enumerate(trace_cols):
+            if numeric[j]:
+                cols.append(col.astype(float).round(2).to_numpy())
+                continue
+            if pd.api.types.is_datetime64_any_dtype(col):
+                col = col.dt.strftime('%Y-%m-%d' if (col.dropna() == col.dropna().dt.normalize()).all() else '%Y-%m-%dT%H:%M:%S')
+            for v in col.unique():
+                key = None if pd.isna(v) else str(v)
+                if key not in codes[j]: codes[j][key] = len(lookups[j]); lookups[j].append(key)
+            cols.append(np.array([codes[j][None if pd.isna(v) else str(v)] for v in col], dtype=float))
+        packed = np.column_stack(cols)
+        codes_only = not np.isnan(packed).any() and packed.min(initial=0) >= 0 and (packed == np.round(packed)).all()
+        t['customdata'] = packed.astype(np.min_scalar_type(int(packed.max(initial=0))) if codes_only else np.float32)
+    return lookups if any(l is not None for l in lookups) else None
+
+def expand_custom(meta, customdata):
+    """Customdata values of a clicked point, with the codes of compact_custom mapped back through `meta`."""
+    lookups = (meta or {}).get('custom') or []
+    return [lookups[j][int(v)] if j < len(lookups) and lookups[j] is not None else v for j, v in enumerate(customdata)]
+
+def bar_traces(df, x, y, color=None, colors=None, custom=None, text=None, orientation='v', **style):
+    """Bar trace dicts of `df`, one per `color` value in order of appearance (as plotly.express groups them).
+    text=True labels each bar with its value, a column name labels it with that column."""
+    groups = [('', df)] if color is None else [(name, df[df[color] == name]) for name in df[color].unique()]
+    traces = []
+    for name, g in groups:
+        t = dict(type='bar', x=g[x].to_numpy(), y=g[y].to_numpy(), name=str(name), legendgroup=str(name),
+                 showlegend=color is not None, orientation=orientation, textposition='auto')
+        if colors and name in colors: t['marker'] = dict(color=colors[name])
+        if custom: t['customdata'] = g[custom].to_numpy()
+        if text is True: t['texttemplate'] = '%{y}' if orientation == 'v' else '%{x}'
+        elif text: t['text'] = g[text].to_numpy()
+        traces.append({**t, **style})
+    return traces
+
+def period_bands(dates, grain):
+    """Shapes and annotations of the month bands behind a dated category axis (one bar position per entry
+    of `dates`): dashed dividers, #cccccc highlights on alternate months and centered labels below the axis.
+    Monthly bars get year bands."""
+    band = pd.Series(pd.to_datetime(dates)).dt.to_period('Y' if grain == 'M' else 'M').reset_index(drop=True)
+    edges = [i for i in range(1, len(band)) if band[i] != band[i - 1]]
+    shapes = [dict(type='line', x0=i - 0.5, x1=i - 0.5, xref='x', y0=0, y1=1, yref='y domain',
+                   line=dict(dash="dash", color="#64748b", width=1.5)) for i in edges]
+
+    # Apply highlights to 1st, 3rd, 5th bands
+    for idx, (start, end) in enumerate(zip([0] + edges, [i - 1 for i in edges] + [len(band) - 1])):
+        if idx % 2 == 0:
+            shapes.append(dict(type='rect', x0=start - 0.5, x1=end + 0.5, xref='x', y0=0, y1=1, yref='y domain',
+                               fillcolor="#cccccc", opacity=0.4, layer="below", line=dict(width=0)))
+
+    annotations = [dict(
+        text=period.strftime('%Y' if grain == 'M' else '%B %Y'),
+        x=group.index.to_series().mean(), y=-0.12, # Closer to axis
+        xref="x", yref="paper",
+        showarrow=False,
+        font=dict(size=11, color="#1e293b"),
+        align="center"
+    ) for period, group in band.groupby(band)]
+    return shapes, annotations
+
+def axis_title_note(text):
+    """Centered axis title below the band labels of a dated chart ("Day of Month" / "Week Starting" / "Month")."""
+    return dict(
+        text=text,
+        x=0.5, y=-0.25, # Positioned below month labels
+        xref="paper", yref="paper",
+        showarrow=False,
+        font=dict(size=12, color="#1e293b", weight="bold"),
+        align="center"
+    )
+
+def patch_figure(widget, fig):
+    """Brings the live figure widget `widget` to `fig` in place: plotly only sends the browser the trace and
+    layout properties that changed (restyle / relayout), not a new widget with the whole figure."""
+    new = fig.to_plotly_json()
+    traces, layout = new['data'], new['layout']
+    fixed = {'type', 'uid', 'template'}  # Trace identity, and the dashboard template every chart shares
+
+    # Keep the leading traces of matching type, drop the rest
+    keep = 0
+    while keep < min(len(widget.data), len(traces)) and widget.data[keep].type == traces[keep].get('type', 'scatter'): keep += 1
+    if len(widget.data) > keep: widget.data = widget.data[:keep]
+
+    with widget.batch_update():
+        for trace, t in zip(widget.data, traces):
+            # Dropped properties are assigned directly: update(k=None) leaves compound arrays (shapes, annotations) in place
+            for k in [k for k in trace.to_plotly_json() if k not in t and k not in fixed]: trace[k] = None
+            trace.update({k: v for k, v in t.items() if k not in fixed}, overwrite=True)
+        for k in [k for k in widget.layout.to_plotly_json() if k not in layout and k not in fixed]: widget.layout[k] = None
+        widget.layout.update({k: v for k, v in layout.items() if k not in fixed}, overwrite=True)
+    if len(traces) > keep: widget.add_traces(traces[keep:])
+
+# Summary
+def fig_plt_trend(r):
+    if not r: return chart()
+    c, month_order = r['c'], r['month_order']
+
+    data = bar_traces(c, 'Month_Year', 'Count', color='Leave Application Category', text=True,
+                      colors={"Applied Before Availing": "#00adef", "Applied Post Availing": "#1f3d7a"},
+                      custom=['Month_Year', 'Leave Application Category'],
+                      textfont=dict(size=9, weight="bold"),
+                      hovertemplate="<b>%{x}</b><br>Category: %{data.name}<br>Count: %{y}<br><i>Click to Drill Through</i><extra></extra>")
+    return chart(data, barmode='group',
+                 xaxis={'categoryorder':'array', 'categoryarray': month_order},
+                 yaxis={'title': {'text': "App Count"}},
+                 bargap=0.3, # Adjust for narrow columns
+                 clickmode='event')
+
+def fig_plt_util(r):
+    if not r: return chart()
+    res, month_order = r['res'], r['month_order']
+
+    tooltip = (
+        "<b>%{x}</b><br>" +
+        "Total Leave Hours: %{customdata[1]:.2f}<br>" +
+        "Working Days: %{customdata[3]}<br>" +
+        "Total Available Org Hours: %{customdata[2]:,.0f}<br>" +
+        "Leave Impact %: %{y:.2f}%<br>" +
+        "<i>Click to Drill Through</i><extra></extra>"
+    )
+
+    line = dict(type='scatter', mode='lines+markers+text', name='', showlegend=False,
+                x=res['Month_Year'].to_numpy(), y=res['Leave Impact %'].to_numpy(),
+                texttemplate='%{y:.2f}%',
+                customdata=res[['Month_Year', 'Total Leave Hours', 'Total Available Org Hours', 'Working Days']].to_numpy(),
+                line=dict(color="#00adef", width=2), textposition='top center',
+                textfont=dict(size=9, weight="bold"),
+                hovertemplate=tooltip)
+    return chart([line],
+                 xaxis={'categoryorder':'array', 'categoryarray': month_order},
+                 yaxis={'title': {'text': "Impact %"}, 'ticksuffix': "%", 'griddash': "dot"},
+                 clickmode='event')
+
+def fig_plt_top(r):
+    if not r: return chart()
+    if 'msg' in r: return chart(title=r['msg'])
+    top, m = r['top'], r['m']
+
+    data = bar_traces(m, 'Value', 'employee_name_t', color='Metric', orientation='h', text=True,
+                      colors={"Leave Instances": "#5FB6FF", "Leave Days": "#1f3d7a"},
+                      custom=['employee_name_t', 'Metric'],
+                      textfont=dict(size=10, weight="bold"),
+                      hovertemplate="<b>%{y}</b><br>%{data.name}: %{x}<br><i>Click to Drill Through</i><extra></extra>")
+    # Text labels (int for instances, .1f for days)
+    for t in data:
+        if t['name'] == 'Leave Days': t['texttemplate'] = '%{x:.1f}'
+
+    # Override for precision alignment
+    return chart(data, barmode='stack',
+                 xaxis={'title': {'text': "Instances / Total Days"}},
+                 yaxis={
+                     'title': {'text': ""},
+                     'categoryorder':'array', 
+                     'categoryarray': top['employee_name_t'].tolist()[::-1],
+                     'automargin': True
+                 },
+                 margin=dict(l=0, r=10, t=10, b=40), # FLUSH LEFT: Override global 5px left margin
+                 clickmode='event')
+
+# Analysis
+def fig_plt_avail(r):
+    if not r: return chart()
+    if 'msg' in r: return chart(title=r['msg'])
+    m, total_count, grain = r['m'], r['total_count'], r['grain']
+
+    # Weekly / monthly bars also carry their last day, so the drill covers the whole bar
+    count = "Count" if grain == 'D' else "Avg per Working Day"
+    data = bar_traces(m, 'DayLabel', 'Count', color='Category', text=True,
+                      colors={"Available Employees": "#00adef", "Employees on Leave": "#1f3d7a"},
+                      custom=['Date', 'Category'] + (['Date_To'] if grain != 'D' else []),
+                      textfont=dict(size=10, weight="bold"),
+                      hovertemplate="<b>%{x}</b><br>Category: %{data.name}<br>" + count + ": %{y}<br><i>Click to Drill Through</i><extra></extra>")
+
+    # Add background highlights for alternating months (#cccccc for 1st, 3rd, etc.)
+    # and vertical dotted lines between months
+    unique_m = m.sort_values('Date').drop_duplicates('DayLabel').reset_index(drop=True)
+    shapes, notes = period_bands(unique_m['Date'], grain)
+
+    return chart(data, barmode='group', shapes=shapes, annotations=notes + [axis_title_note(GRAIN_TITLES[grain])],
+                 xaxis=dict(
+                     type='category',
+                     tickvals=unique_m['DayLabel'].tolist(),
+                     ticktext=unique_m['DayNum'].tolist(),
+                     showgrid=False, # Remote vertical lines
+                     categoryorder='array',
+                     categoryarray=unique_m['DayLabel'].tolist()
+                 ), 
+                 clickmode='event',
+                 yaxis=dict(
+                     title=dict(text="Employee Count"),
+                     range=[0, total_count * 1.15],
+                     showgrid=False # Remove horizontal lines
+                 )) # Padding for outside text
+
+
+# Attendance
+def fig_plt_daily_att(r):
+    if not r: return chart()
+    if 'msg' in r: return chart(title=r['msg'])
+    c, grain = r['c'], r['grain']
+
+    # Consistent color map
+    colors = {
+        "Work From Office": "#00d28d", 
+        "Work From Home": "#ff5a5f", 
+        "On Duty": "#5c7cfa", 
+        "Work From Anywhere": "#ffa94d", 
+        "Missed Entry": "#be4bdb",
+        "On Leave": "#1f3d7a"
+    }
+
+    # Weekly / monthly bars also carry their last day, so the drill covers the whole bar
+    data = bar_traces(c, 'DayLabel', 'Count', color='presence_type', text=True, colors=colors,
+                      custom=['dt_norm', 'presence_type'] + (['dt_to'] if grain != 'D' else []),
+                      textposition='inside', textfont=dict(size=9, weight="bold"), textangle=0, cliponaxis=False,
+                      hovertemplate="<b>%{x}</b><br>Type: %{data.name}<br>Count: %{y}<br><i>Click to Drill Through</i><extra></extra>")
+
+    # Add background highlights for alternating months (#cccccc for 1st, 3rd, etc.)
+    # and vertical dotted lines between months
+    unique_m = c.sort_values('dt_norm').drop_duplicates('DayLabel').reset_index(drop=True)
+    shapes, notes = period_bands(unique_m['dt_norm'], grain)
+
+    return chart(data, barmode='stack', shapes=shapes, annotations=notes + [axis_title_note(GRAIN_TITLES[grain])],
+                 yaxis=dict(title=dict(text="Count")),
+                 xaxis=dict(
+                     type='category',
+                     tickvals=unique_m['DayLabel'].tolist(),
+                     ticktext=unique_m['DayNum'].tolist(),
+                     categoryorder='array',
+                     categoryarray=unique_m['DayLabel'].tolist(),
+                     showgrid=False # Remote vertical lines
+                 ), 
+                 clickmode='event')
+
+def fig_plt_hrs_dist(r):
+    if not r: return chart()
+    if 'msg' in r: return chart(title=r['msg'])
+    res = r['res']
+
+    data = bar_traces(res, 'Office Hrs Bucket', 'Total_Emp_WFO', text=True,
+                      custom=['Office Hrs Bucket', 'Avg_Office_Hours'],
+                      marker=dict(color="#00adef"),
+                      textfont=dict(size=10, weight="bold"),
+                      hovertemplate="<b>%{x}</b><br>Total Emp WFO: %{y}<br>Avg Office Hours: %{customdata[1]:.2f}h<br><i>Click to Drill Through</i><extra></extra>")
+    return chart(data, xaxis=dict(title=dict(text="Office Hrs Bucket")), yaxis=dict(title=dict(text="Total Emp WFO")),
+                 clickmode='event', bargap=0.6)
+
+def fig_plt_wfh_comp(r):
+    if not r: return chart()
+    c, month_order = r['c'], r['month_order']
+
+    data = bar_traces(c, 'Month_Year', 'Distinct_Employees', color='WFH Bucket', text=True,
+                      colors={"WFH > 9": "#ff5a5f", "WFH <= 9": "#1c7ed6"},
+                      custom=['Month_Year', 'WFH Bucket'],
+                      textfont=dict(size=10, weight="bold"),
+                      hovertemplate="<b>%{x}</b><br>Bucket: %{data.name}<br>Count: %{y}<br><i>Click to Drill Through</i><extra></extra>")
+    return chart(data, barmode='group',
+                 xaxis={'categoryorder':'array', 'categoryarray': month_order, 'title': {'text': "Month"}},
+                 yaxis={'title': {'text': "Total Count"}},
+                 clickmode='event')
+
+FIGURES = {
+    'plt_trend': fig_plt_trend,
+    'plt_util': fig_plt_util,
+    'plt_top': fig_plt_top,
+    'plt_avail': fig_plt_avail,
+    'plt_daily_att': fig_plt_daily_att,
+    'plt_hrs_dist': fig_plt_hrs_dist,
+    'plt_wfh_comp': fig_plt_wfh_comp,
+}
+
+def build_figure(output_id, state):
+    """Figure of chart `output_id` under `state` (from its cached input)."""
+    return FIGURES[output_id](run_query(output_id, state))
+
 # ====================================================
 #   UI HELPERS
 # ====================================================
 def slicer_box(label, id, choices, selected="All", cls=""):
     return ui.div({"class": f"slicer-box {cls}"}, ui.span(label, class_="slicer-label"), ui.input_select(id, "", ["All"] + choices, selected=selected))
 
+def grid_ui(id):
+    """Paged table: filter box, sort controls and page navigation; the server renders only the visible page."""
+    return ui.div({"class": "grid"},
+        ui.div({"class": "grid-bar"},
+            ui.input_text(f"{id}_q", "", placeholder="Filter rows..."),
+            ui.input_select(f"{id}_sort", "", {"": "Sort by..."}),
+            ui.input_select(f"{id}_dir", "", {"asc": "Ascending", "desc": "Descending"}),
+            ui.input_select(f"{id}_size", "", GRID_PAGE_SIZES, selected=GRID_PAGE_SIZES[0]),
+            ui.input_action_button(f"{id}_prev", "‹", class_="grid-nav"),
+            ui.output_text(f"{id}_info", inline=True),
+            ui.input_action_button(f"{id}_next", "›", class_="grid-nav")
+        ),
+        ui.div({"class": "table-scroll"}, ui.output_table(id))
+    )
+
+def grid_sort_key(col):
+    """Sorts text columns holding formatted numbers (e.g. the leave matrix) numerically, blanks first."""
+    if col.dtype != object and not isinstance(col.dtype, pd.StringDtype): return col
+    text = col.astype(str).str.strip()
+    num = pd.to_numeric(text.str.replace(',', ''), errors='coerce')
+    return num.fillna(0) if num.notna().sum() == text.ne('').sum() else col.astype(str).str.lower()
+
 def period_ui():
     """Returns the placeholder for the dynamic period content."""
     return ui.output_ui("ui_period_popover_content")
@@ -192,6 +1519,16 @@ app_ui = ui.page_fluid(
             box-shadow: var(--shadow);
             margin-bottom: 20px;
         }
+        .apply-controls {
+            position: absolute;
+            right: 30px;
+            display: flex;
+            align-items: center;
+            gap: 10px;
+            font-size: 0.8rem;
+        }
+        .apply-controls .form-group, .apply-controls .shiny-input-container { margin: 0; width: auto; }
+        .apply-controls .btn { padding: 2px 14px; font-size: 0.8rem; font-weight: 600; }
         .title { 
             font-size: 1.4rem; 
             font-weight: 700; 
@@ -328,6 +1665,10 @@ app_ui = ui.page_fluid(
         .total-row { font-weight: 700; background: #f8fafc; }
         .table-scroll { overflow: auto; max-height: 480px; border: 1px solid #e2e8f0; border-radius: 12px; }
         table thead th { position: sticky; top: 0; background: #f8fafc; z-index: 10; }
+        .grid-bar { display: flex; flex-wrap: wrap; align-items: center; gap: 8px; margin-bottom: 10px; font-size: 0.8rem; color: var(--text-light); }
+        .grid-bar .form-group, .grid-bar .shiny-input-container { margin: 0 !important; width: auto !important; }
+        .grid-bar .form-control, .grid-bar .form-select { font-size: 0.8rem; padding: 4px 8px; min-width: 110px; }
+        .grid-nav { padding: 2px 10px !important; font-weight: 700; }
         table thead th:first-child { position: sticky; left: 0; z-index: 20; text-align: left; }
         table tbody tr td:first-child { position: sticky; left: 0; background: #fff; z-index: 5; font-weight: 600; text-align: left; }
         
@@ -387,95 +1728,100 @@ app_ui = ui.page_fluid(
             console.log = wrap(console.log, /anywidget/);
         })();
 
+        // Customdata of a point with the lookup codes of the compact chart payload mapped back (layout.meta.custom)
+        function expandCustom(plot, pt) {
+            var lookups = (plot.layout.meta || {}).custom || [];
+            return Array.from(pt.customdata, function(v, j) { return lookups[j] ? lookups[j][v] : v; });
+        }
+
         $(document).on('shiny:connected', function(event) {
             if (!$('#drill-menu').length) {
                 $('<ul id="drill-menu" class="custom-menu"><li id="do-drill">Drill through</li></ul>').appendTo('body');
             }
 
-            setInterval(function() {
-                var attCharts = ['plt_wfh_comp', 'plt_hrs_dist', 'plt_daily_att'];
-                var analysisCharts = ['plt_avail'];
-                var summaryCharts = ['plt_trend', 'plt_util', 'plt_top'];
-                
-                attCharts.concat(analysisCharts).concat(summaryCharts).forEach(function(id) {
-                    var container = document.getElementById(id);
-                    if (!container) return;
-                    var plot = container.querySelector('.js-plotly-plot');
-                    
-                    if (plot && typeof plot.on === 'function' && !plot.getAttribute('data-drill-bound')) {
-                        plot.setAttribute('data-drill-bound', 'true');
-                        
-                        // Left Click - Direct Drill
-                        plot.on('plotly_click', function(data) {
-                            if(data.points && data.points.length > 0) {
-                                var pt = data.points[0];
-                                if (pt.customdata) {
-                                    var type = (id === 'plt_wfh_comp') ? 'WFH' : (id === 'plt_hrs_dist' ? 'HRS' : (id === 'plt_daily_att' ? 'DAILY' : id));
-                                    var isSummary = summaryCharts.includes(id);
-                                    var isAnalysis = analysisCharts.includes(id);
-                                    
-                                    var payload = { type: type };
-                                    
-                                    // 1. Map Bucket/Category
-                                    if (type === 'HRS') {
-                                        payload.bucket = pt.customdata[0]; // Office Hrs Bucket
-                                    } else if (type === 'plt_top') {
-                                        payload.bucket = pt.y; // Employee Name (displayed on Y)
-                                        payload.month = pt.customdata[0]; // Logic uses month for name
-                                    } else if (type === 'DAILY' || type === 'plt_avail') {
-                                        payload.bucket = pt.customdata[1]; // Category/Presence Type
-                                    } else {
-                                        payload.bucket = pt.customdata[1] || pt.customdata[0] || pt.y;
-                                    }
-                                    
-                                    // 2. Map Date/Month
-                                    if (type === 'DAILY' || type === 'plt_avail') {
-                                        payload.date = pt.customdata[0];
-                                    } else if (type === 'WFH' || type === 'plt_trend' || type === 'plt_util') {
-                                        payload.month = pt.customdata[0];
-                                    }
-                                    
-                                    var inputName = isSummary ? 'summary_drill_event' : (isAnalysis ? 'leave_drill_event' : 'drill_event');
-                                    Shiny.setInputValue(inputName, payload, {priority: 'event'});
-                                }
-                            }
-                        });
-
-                        // Right Click - Context Menu
-                        plot.addEventListener('contextmenu', function(e) {
-                            e.preventDefault();
-                            var hoverData = plot.hoverData;
-                            if (hoverData && hoverData.length > 0) {
-                                var pt = hoverData[0];
-                                if (pt.customdata) {
-                                    var type = (id === 'plt_wfh_comp') ? 'WFH' : (id === 'plt_hrs_dist' ? 'HRS' : (id === 'plt_daily_att' ? 'DAILY' : id));
-                                    var isSummary = summaryCharts.includes(id);
-                                    var isAnalysis = analysisCharts.includes(id);
-                                    
-                                    var payload = { type: type };
-                                    
-                                    // Match Left-Click Mapping
-                                    if (type === 'HRS') payload.bucket = pt.customdata[0];
-                                    else if (type === 'plt_top') { payload.bucket = pt.y; payload.month = pt.customdata[0]; }
-                                    else if (type === 'DAILY' || type === 'plt_avail') payload.bucket = pt.customdata[1];
-                                    else payload.bucket = pt.customdata[1] || pt.customdata[0];
-                                    
-                                    if (type === 'DAILY' || type === 'plt_avail') payload.date = pt.customdata[0];
-                                    else if (type === 'WFH' || type === 'plt_trend' || type === 'plt_util') payload.month = pt.customdata[0];
-                                    
-                                    var mode = isSummary ? 'SUMMARY' : (isAnalysis ? 'LEAVE' : 'ATT');
-                                    $('#drill-menu').data('eventData', {payload: payload, mode: mode});
-                                    $('#drill-menu').css({
-                                        top: e.pageY + "px",
-                                        left: e.pageX + "px",
-                                        display: "block"
-                                    });
-                                }
-                            }
-                        });
-                    }
+            // Drill-through charts: the drill type sent to the server and the drill page (input) it opens
+            var drillCharts = {
+                plt_wfh_comp:  {type: 'WFH',        mode: 'ATT'},
+                plt_hrs_dist:  {type: 'HRS',        mode: 'ATT'},
+                plt_daily_att: {type: 'DAILY',      mode: 'ATT'},
+                plt_avail:     {type: 'plt_avail',  mode: 'LEAVE'},
+                plt_trend:     {type: 'plt_trend',  mode: 'SUMMARY'},
+                plt_util:      {type: 'plt_util',   mode: 'SUMMARY'},
+                plt_top:       {type: 'plt_top',    mode: 'SUMMARY'}
+            };
+            var drillInputs = {ATT: 'drill_event', LEAVE: 'leave_drill_event', SUMMARY: 'summary_drill_event'};
+
+            // Drill payload of a clicked / hovered point (shared by left-click and the context menu)
+            function drillPayload(id, plot, pt) {
+                if (!pt || !pt.customdata) return null;
+                var cd = expandCustom(plot, pt);
+                var type = drillCharts[id].type;
+                var payload = { type: type };
+
+                // 1. Map Bucket/Category
+                if (type === 'HRS') {
+                    payload.bucket = cd[0]; // Office Hrs Bucket
+                } else if (type === 'plt_top') {
+                    payload.bucket = pt.y; // Employee Name (displayed on Y)
+                    payload.month = cd[0]; // Logic uses month for name
+                } else if (type === 'DAILY' || type === 'plt_avail') {
+                    payload.bucket = cd[1]; // Category/Presence Type
+                } else {
+                    payload.bucket = cd[1] || cd[0] || pt.y;
+                }
+
+                // 2. Map Date/Month
+                if (type === 'DAILY' || type === 'plt_avail') {
+                    payload.date = cd[0];
+                    if (cd[2]) payload.date_to = cd[2]; // Last day of a week/month bar
+                } else if (type === 'WFH' || type === 'plt_trend' || type === 'plt_util') {
+                    payload.month = cd[0];
+                }
+                return payload;
+            }
+
+            function bindDrill(id, plot) {
+                if (plot.getAttribute('data-drill-bound')) return;
+                plot.setAttribute('data-drill-bound', 'true');
+                var mode = drillCharts[id].mode;
+
+                // Left Click - Direct Drill
+                plot.on('plotly_click', function(data) {
+                    var payload = drillPayload(id, plot, data.points && data.points[0]);
+                    if (payload) Shiny.setInputValue(drillInputs[mode], payload, {priority: 'event'});
+                });
+
+                // Right Click - Context Menu
+                plot.addEventListener('contextmenu', function(e) {
+                    e.preventDefault();
+                    var payload = drillPayload(id, plot, plot.hoverData && plot.hoverData[0]);
+                    if (!payload) return;
+                    $('#drill-menu').data('eventData', {payload: payload, mode: mode});
+                    $('#drill-menu').css({
+                        top: e.pageY + "px",
+                        left: e.pageX + "px",
+                        display: "block"
+                    });
                 });
-            }, 1000);
+            }
+
+            // Bind when a chart output renders: the widget draws its plot asynchronously after the value
+            // arrives, so watch the container only until the plot element shows up
+            $(document).on('shiny:value', function(event) {
+                var id = event.name;
+                if (!drillCharts[id]) return;
+                var container = document.getElementById(id);
+                if (!container) return;
+                var tryBind = function() {
+                    var plot = container.querySelector('.js-plotly-plot');
+                    if (!plot || typeof plot.on !== 'function') return false;
+                    bindDrill(id, plot);
+                    return true;
+                };
+                if (tryBind()) return;
+                var observer = new MutationObserver(function() { if (tryBind()) observer.disconnect(); });
+                observer.observe(container, {childList: true, subtree: true});
+            });
 
             $(document).on('mousedown', function(e) {
                 if (!$(e.target).closest("#drill-menu").length) {
@@ -486,19 +1832,14 @@ app_ui = ui.page_fluid(
             $(document).on('click', '#do-drill', function() {
                 var data = $('#drill-menu').data('eventData');
                 if (data && data.payload) {
-                    var inputName = 'drill_event';
-                    if (data.mode === 'SUMMARY') inputName = 'summary_drill_event';
-                    else if (data.mode === 'LEAVE') inputName = 'leave_drill_event';
-                    
-                    Shiny.setInputValue(inputName, data.payload, {priority: 'event'});
+                    Shiny.setInputValue(drillInputs[data.mode], data.payload, {priority: 'event'});
                 }
                 $("#drill-menu").hide();
             });
 
             // Handle selection reset
             Shiny.addCustomMessageHandler('deselectplots', function(msg) {
-                var allCharts = ['plt_wfh_comp', 'plt_hrs_dist', 'plt_daily_att', 'plt_avail', 'plt_trend', 'plt_util', 'plt_top'];
-                allCharts.forEach(function(id) {
+                Object.keys(drillCharts).forEach(function(id) {
                     var container = document.getElementById(id);
                     if (container) {
                         var plot = container.querySelector('.js-plotly-plot');
@@ -512,7 +1853,12 @@ app_ui = ui.page_fluid(
     """),
     
     ui.div({"class": "header"}, 
-        ui.div("QBA Leave & Attendance Dashboard", class_="title")
+        ui.div("QBA Leave & Attendance Dashboard", class_="title"),
+        # Slicer edits apply on their own after a short pause, or only on "Apply" when auto-apply is off
+        ui.div({"class": "apply-controls"},
+            ui.input_switch("s_auto_apply", "Auto-apply", value=True),
+            ui.input_action_button("btn_apply", "Apply", class_="btn-light", disabled=True)
+        )
     ),
     
     # Global Synced Slicer Row (Refactored with unique IDs per tab to avoid DOM duplication errors)
@@ -569,7 +1915,7 @@ app_ui = ui.page_fluid(
                 ui.div({"class": "card"}, ui.div("Employees Availability Forecast", class_="card-title"), output_widget("plt_avail")),
                 ui.div({"class": "card"}, 
                     ui.div("Department wise Total Leaves by Leavetype", class_="card-title"), 
-                    ui.div({"class": "table-scroll"}, ui.output_table("tbl_matrix"))
+                    grid_ui("tbl_matrix")
                 )
             )
         ),
@@ -587,7 +1933,7 @@ app_ui = ui.page_fluid(
             ui.div({"style": "padding:15px"},
                 ui.div({"class": "card"}, 
                     ui.div(ui.output_text("txt_summary_drill_title"), class_="card-title"),
-                    ui.div({"class": "table-scroll"}, ui.output_table("tbl_summary_drill")),
+                    grid_ui("tbl_summary_drill"),
                     ui.div({"style": "margin-top: 15px"}, 
                         ui.input_action_button("btn_summary_back", "Back to Summary", class_="btn-primary")
                     )
@@ -598,7 +1944,7 @@ app_ui = ui.page_fluid(
             ui.div({"style": "padding:15px"},
                 ui.div({"class": "card"}, 
                     ui.div(ui.output_text("txt_drill_title"), class_="card-title"),
-                    ui.div({"class": "table-scroll"}, ui.output_table("tbl_drill")),
+                    grid_ui("tbl_drill"),
                     ui.div({"style": "margin-top: 15px"}, 
                         ui.input_action_button("btn_back", "Back to Dashboard", class_="btn-primary")
                     )
@@ -609,7 +1955,7 @@ app_ui = ui.page_fluid(
             ui.div({"style": "padding:15px"},
                 ui.div({"class": "card"}, 
                     ui.div(ui.output_text("txt_leave_drill_title"), class_="card-title"),
-                    ui.div({"class": "table-scroll"}, ui.output_table("tbl_leave_drill")),
+                    grid_ui("tbl_leave_drill"),
                     ui.div({"style": "margin-top: 15px"}, 
                         ui.input_action_button("btn_leave_back", "Back to Analysis", class_="btn-primary")
                     )
@@ -626,20 +1972,21 @@ app_ui = ui.page_fluid(
 def server(input, output, session):
     
     # Initialize Persistent Filter State
-    S_STATE = {
-        'year': reactive.Value("2025"),
-        'qtr': reactive.Value("Qtr 4"),
-        'month': reactive.Value([]),
-        'dept': reactive.Value("All"),
-        'emp': reactive.Value("All"),
-        'et': reactive.Value("All"),
-        'lt': reactive.Value("All"),
-        'mgr': reactive.Value("All"),
-        'proj': reactive.Value("All"),
-        'pm': reactive.Value("All"),
-        'ws': reactive.Value("All"),
-        'at': reactive.Value("All")
+    defaults = {
+        'year': "2025",
+        'qtr': "Qtr 4",
+        'month': [],
+        'dept': "All",
+        'emp': "All",
+        'et': "All",
+        'lt': "All",
+        'mgr': "All",
+        'proj': "All",
+        'pm': "All",
+        'ws': "All",
+        'at': "All"
     }
+    S_STATE = {k: reactive.Value(v) for k, v in defaults.items()}
     
     # Drill-Through State
     DRILL_DATA = reactive.Value({'month': None, 'bucket': None})
@@ -649,50 +1996,84 @@ def server(input, output, session):
     # Navigation Listener
     @reactive.effect
     @reactive.event(input.btn_back)
-    def _go_back():
+    async def _go_back():
         ui.update_navset("tabs", selected="Attendance")
-        session.send_custom_message("deselectplots", {})
+        await session.send_custom_message("deselectplots", {})
 
     @reactive.effect
     @reactive.event(input.btn_leave_back)
-    def _go_back_leave():
+    async def _go_back_leave():
         ui.update_navset("tabs", selected="Analysis")
-        session.send_custom_message("deselectplots", {})
+        await session.send_custom_message("deselectplots", {})
 
     @reactive.effect
     @reactive.event(input.btn_summary_back)
-    def _go_back_summary():
+    async def _go_back_summary():
         ui.update_navset("tabs", selected="Summary")
-        session.send_custom_message("deselectplots", {})
+        await session.send_custom_message("deselectplots", {})
 
     @reactive.effect
     @reactive.event(input.tabs)
-    def _tab_changed():
+    async def _tab_changed():
         # Clear selections whenever returning to a main dashboard page
         if input.tabs() in ["Summary", "Analysis", "Attendance"]:
-            session.send_custom_message("deselectplots", {})
+            await session.send_custom_message("deselectplots", {})
 
     # Observers to Capture State Changes and Sync (Surgical to prevent resets during navigation)
     def is_dash():
         return input.tabs() in ["Summary", "Analysis", "Attendance"]
 
+    # Slicer edits are staged in DRAFT, then applied to S_STATE together in one effect run (one
+    # filter-state transaction: every output recomputes once per user action, not once per changed key)
+    DRAFT = {k: reactive.Value(v) for k, v in defaults.items()}
+    last_edit = [0.0]
+
+    def stage(key, v):
+        """Stages a slicer edit; False when it changes nothing."""
+        with reactive.isolate():
+            if v == DRAFT[key](): return False
+            last_edit[0] = time.monotonic()
+            DRAFT[key].set(v)
+        return True
+
+    def staged():
+        return {k: d() for k, d in DRAFT.items() if d() != S_STATE[k]()}
+
+    def apply_staged():
+        with reactive.isolate():
+            for k, v in staged().items(): S_STATE[k].set(v)
+
+    @reactive.effect
+    def _commit():
+        # Auto-apply: debounce the staged edits, applying them once no edit came in for SLICER_DEBOUNCE_S
+        if not staged() or not input.s_auto_apply(): return
+        wait = last_edit[0] + SLICER_DEBOUNCE_S - time.monotonic()
+        if wait > 0: reactive.invalidate_later(wait)
+        else: apply_staged()
+
+    @reactive.effect
+    @reactive.event(input.btn_apply)
+    def _apply():
+        apply_staged()
+
+    @reactive.effect
+    def _apply_button():
+        n = len(staged())
+        ui.update_action_button("btn_apply", label=f"Apply ({n})" if n else "Apply", disabled=not n)
+
     @reactive.effect
     @reactive.event(input.s_year)
     def _sync_y():
         if not is_dash(): return
         v = input.s_year()
-        if v is not None:
-            with reactive.isolate():
-                if v != S_STATE['year'](): S_STATE['year'].set(v)
+        if v is not None: stage('year', v)
 
     @reactive.effect
     @reactive.event(input.s_qtr)
     def _sync_q():
         if not is_dash(): return
         v = input.s_qtr()
-        if v is not None:
-            with reactive.isolate():
-                if v != S_STATE['qtr'](): S_STATE['qtr'].set(v)
+        if v is not None: stage('qtr', v)
 
     @reactive.effect
     @reactive.event(input.s_month)
@@ -700,9 +2081,7 @@ def server(input, output, session):
         if not is_dash(): return
         v = input.s_month()
         if v is None: return
-        v = list(v)
-        with reactive.isolate():
-            if v != S_STATE['month'](): S_STATE['month'].set(v)
+        stage('month', list(v))
 
     # General Slicer Syncers (Refactored to handle multiple IDs per state key)
     def create_syncer(inp_list, state_key):
@@ -714,16 +2093,12 @@ def server(input, output, session):
             # Capture any change in the list of inputs
             for inp_id in inp_list:
                 v = getattr(input, inp_id)()
-                if v is not None:
-                    with reactive.isolate():
-                        if v != S_STATE[state_key]():
-                            # Update global state
-                            S_STATE[state_key].set(v)
-                            # Sync all other inputs for this key
-                            for other_id in inp_list:
-                                if other_id != inp_id:
-                                    ui.update_select(other_id, selected=v)
-                            break # One update is enough per trigger
+                if v is not None and stage(state_key, v):
+                    # Sync all other inputs for this key
+                    for other_id in inp_list:
+                        if other_id != inp_id:
+                            ui.update_select(other_id, selected=v)
+                    break # One update is enough per trigger
         return _sync_multi
 
     _sync_dept = create_syncer('s_dept', 'dept')
@@ -736,91 +2111,142 @@ def server(input, output, session):
     _sync_ws = create_syncer('s_ws_att', 'ws')
     _sync_at = create_syncer(['s_at_sum', 's_at_att'], 'at')
 
-    def filter_df(raw_df):
-        if raw_df is None or raw_df.empty: return pd.DataFrame()
-        df = raw_df.copy()
-        try:
-            # 1. Period Filter
-            y, q, m = S_STATE['year'](), S_STATE['qtr'](), S_STATE['month']()
-            # print(f"DEBUG Filter: Y={y}, Q={q}, M={m}")
-            
-            if y != "All" and y:
-                if q != "All" and q in DB.Tree.get(y, {}):
-                    available_months = DB.Tree[y][q]
-                    sel_m = m if (m and len(m) > 0) else available_months
-                    keys = [f"{y}_{mon}" for mon in sel_m]
-                else:
-                    keys = [f"{y}_{mon}" for qtr in DB.Tree.get(y, {}) for mon in DB.Tree[y][qtr]]
-                
-                # print(f"DEBUG: Filtering for keys {keys}")
-                
-                # Multi-column period filtering strategy
-                matched = False
-                for col in ['YM_KEY', 'dt', 'from_date', 'to_date']:
-                    if col in df.columns:
-                        if col == 'YM_KEY':
-                            df = df[df['YM_KEY'].isin(keys)]
-                        else:
-                            # Generate key on the fly for date columns
-                            tmp_keys = pd.to_datetime(df[col]).dt.year.astype(str) + "_" + pd.to_datetime(df[col]).dt.month_name()
-                            df = df[tmp_keys.isin(keys)]
-                        matched = True
-                        break
-                
-                if not matched:
-                    print(f"WARNING: No date column found for period filter in dataframe with columns: {df.columns.tolist()}")
-            
-            # 2. General Slicers
-            if S_STATE['dept']() != "All": df = df[df['department_name_t'] == S_STATE['dept']()]
-            if S_STATE['emp']() != "All": df = df[df['employee_name_t'] == S_STATE['emp']()]
-            if S_STATE['et']() != "All": df = df[df['employment_type_t'] == S_STATE['et']()]
-            if S_STATE['mgr']() != "All": df = df[df['reporting_manager_name_t'] == S_STATE['mgr']()]
-            if S_STATE['ws']() != "All" and 'workflow_state' in df.columns: df = df[df['workflow_state'] == S_STATE['ws']()]
-            
-            # 3. Leave/Att Specific
-            if 'leave_type' in df.columns and S_STATE['lt']() != "All":
-                df = df[df['leave_type'].astype(str).str.title() == S_STATE['lt']()]
-            
-            at_val = S_STATE['at']()
-            if at_val != "All":
-                if 'mode_of_attendance' in df.columns:
-                    df = df[df['mode_of_attendance'].astype(str).str.title() == at_val]
-                else:
-                    # Indirect filtering: filter by users who have entries for this attendance type
-                    att_raw = DB.DF.get('attendance', pd.DataFrame())
-                    if not att_raw.empty:
-                        match_ids = att_raw[att_raw['mode_of_attendance'].astype(str).str.title() == at_val]['user_id'].unique()
-                        u_col = 'user_id' if 'user_id' in df.columns else ('User Id' if 'User Id' in df.columns else None)
-                        if u_col: df = df[df[u_col].isin(match_ids)]
-            
-            # 4. Project Filters (Using Allocation mapping)
-            proj = S_STATE['proj']()
-            pm = S_STATE['pm']()
-            
-            if proj != "All" or pm != "All":
-                pdm = DB.DF.get('projects_details_mapped', pd.DataFrame())
-                am = DB.DF.get('alloc_mapped', pd.DataFrame())
-                if not pdm.empty and not am.empty:
-                    p_mask = pd.Series(True, index=pdm.index)
-                    if proj != "All": p_mask &= (pdm['project_name'].astype(str).str.title() == proj)
-                    if pm != "All": p_mask &= (pdm['project_manager'].astype(str).str.title() == pm)
-                    
-                    target_projs = pdm[p_mask]['proj_id'].tolist()
-                    target_users = am[am['proj_id'].isin(target_projs)]['user_id'].unique().tolist()
-                    
-                    user_col = 'user_id' if 'user_id' in df.columns else ('User Id' if 'User Id' in df.columns else None)
-                    if user_col: df = df[df[user_col].isin(target_users)]
+    # Paged Tables (Filter & sort run server-side on the full result; only the visible page is rendered)
+    def create_grid(id, source, footer=0):
+        """Serves table `source()` as output `id` of a grid_ui, keeping its last `footer` rows
+        (e.g. a Total row) below every page and out of the filtering and sorting."""
+        page = reactive.Value(0)
+        shown_cols = []
+        field = lambda name: getattr(input, f"{id}_{name}")
+
+        @reactive.calc
+        def view():
+            df = source()
+            n_foot = footer if len(df) > footer else 0
+            body, foot = df.iloc[:len(df) - n_foot], df.iloc[len(df) - n_foot:]
+            q = (field('q')() or "").strip().lower()
+            if q and not body.empty:
+                hit = np.zeros(len(body), dtype=bool)
+                for c in body.columns: hit |= body[c].astype(str).str.lower().str.contains(q, regex=False).to_numpy()
+                body = body[hit]
+            col = field('sort')()
+            if col in body.columns:
+                body = body.sort_values(col, ascending=field('dir')() != "desc", kind='stable', key=grid_sort_key)
+            return body, foot
+
+        def page_size():
+            size = field('size')()
+            return int(size) if size else int(GRID_PAGE_SIZES[0])
+
+        def n_pages():
+            return max(1, -(-len(view()[0]) // page_size()))
+
+        @reactive.effect
+        def _columns():
+            cols = source().columns.astype(str).tolist()
+            if cols == shown_cols: return
+            shown_cols[:] = cols
+            with reactive.isolate(): cur = field('sort')()
+            ui.update_select(f"{id}_sort", choices={"": "Sort by...", **{c: c for c in cols}}, selected=cur if cur in cols else "")
+
+        @reactive.effect
+        def _reset():
+            view(); field('size')()
+            with reactive.isolate(): page.set(0)
+
+        @reactive.effect
+        @reactive.event(field('prev'))
+        def _prev():
+            page.set(max(0, page() - 1))
 
-        except Exception as e: print(f"Filter Error: {e}")
-        return df
+        @reactive.effect
+        @reactive.event(field('next'))
+        def _next():
+            page.set(min(n_pages() - 1, page() + 1))
+
+        @output(id=id)
+        @render.table
+        def _page():
+            body, foot = view()
+            p, size = min(page(), n_pages() - 1), page_size()
+            return pd.concat([body.iloc[p * size:(p + 1) * size], foot]) if len(foot) else body.iloc[p * size:(p + 1) * size]
+
+        @output(id=f"{id}_info")
+        @render.text
+        def _info():
+            total, size = len(view()[0]), page_size()
+            if total == 0: return "No rows"
+            p = min(page(), n_pages() - 1)
+            return f"Rows {p * size + 1:,}-{min(total, (p + 1) * size):,} of {total:,} (page {p + 1}/{n_pages()})"
+
+        return _page
+
+    # Filtering returns shared, read-only frames: callers derive columns with .assign() or
+    # local Series and never mutate the result in place, so no full-frame copies are made.
+    # One filter-state calc per set of applicable slicers (state_keys): it reads only those S_STATE keys,
+    # so a slicer change invalidates just the calcs and charts whose datasets it can select rows of.
+    scoped_states = {}
+    def scoped_state(name):
+        keys = state_keys(name)
+        if keys not in scoped_states:
+            @reactive.calc
+            def _state():
+                return make_state(S_STATE['year'](), S_STATE['qtr'](), S_STATE['month'](),
+                                  **{k: S_STATE[k]() for k in keys})
+            scoped_states[keys] = _state
+        return scoped_states[keys]
+
+    for name in [*DB.DF, *SOURCES]: scoped_state(name)
+
+    def filter_state(name):
+        return scoped_state(name)()
+
+    # Computed off the event loop: build(*inputs()) runs on COMPUTE_POOL each time its reactive inputs
+    # change, and a newer change cancels the stale run (dropped if still queued, ignored if running)
+    def background(build, inputs):
+        @reactive.extended_task
+        async def task(*args):
+            return await offload(build, *args)
 
+        @reactive.effect
+        def _invoke():
+            args = inputs()
+            task.cancel()
+            task.invoke(*args)
+
+        def result():
+            # A superseded run shows as in progress (not as a cleared output) until its replacement is done
+            if task.status() == "cancelled": req(False, cancel_output="progress")
+            return task.result()
+        return result
+
+    def drill_inputs(data, *names):
+        """Drill payload, plus the filter states of the drill's datasets once a point was clicked."""
+        d = data()
+        return d, ({n: filter_state(n) for n in names} if d['bucket'] else None)
+
+    def leave_drill_rows(d, state):
+        """Approved/Open leaves behind a clicked leave chart point (None for an unknown chart)."""
+        if d.get('type') in ('plt_trend', 'plt_util'):
+            ym = month_key(d.get('month'))
+            df = only_active(drill_rows('leave_applications', state, DB.lookup('leave_applications', 'app_ym', ym)))
+            if d.get('type') == 'plt_trend' and not df.empty: df = df[df['Leave Application Category'] == d['bucket']]
+            return df
+        if d.get('type') == 'plt_top':
+            # Robust name matching: trim and case-insensitive
+            keys = DB.lookup('users_details', 'name', str(d.get('month', '')).strip().lower())
+            pos = np.unique(np.concatenate([DB.lookup('leave_applications', 'emp_key', k) for k in keys] or [NO_ROWS]))
+            return only_active(drill_rows('leave_applications', state, pos))
+        if d.get('type') == 'plt_avail':
+            first, last = day_key(pd.Series([d['date'], d.get('date_to') or d['date']]))
+            return only_active(drill_rows('leave_applications', state, DB.leaves_on(first, last)))
+        return None
 
-    @reactive.calc
-    def f_leave(): return filter_df(DB.DF.get('leave_applications', pd.DataFrame()))
-    @reactive.calc
-    def f_att(): return filter_df(DB.DF.get('attendance', pd.DataFrame()))
-    @reactive.calc
-    def f_lb(): return filter_df(DB.DF.get('leave_balance', pd.DataFrame()))
+    def date_span(d):
+        """Drill title date of a dated chart payload: the day, or the range of a weekly/monthly bar."""
+        first, last = pd.to_datetime(d['date']), pd.to_datetime(d.get('date_to') or d['date'])
+        if first == last: return first.strftime('%d %b %Y')
+        return f"{first.strftime('%d %b')} - {last.strftime('%d %b %Y')}"
 
     @output
     @render.ui
@@ -830,20 +2256,20 @@ def server(input, output, session):
         
         # Render hierarchy based on current Year/Qtr
         years = sorted(list(DB.Tree.keys()), reverse=True)
-        y = S_STATE['year']()
+        y = DRAFT['year']()
         
         controls = [ui.input_select("s_year", "Select Year", ["All"] + years, selected=y)]
         
         if y != "All" and y in DB.Tree:
             qtrs = list(DB.Tree[y].keys())
-            q = S_STATE['qtr']()
+            q = DRAFT['qtr']()
             if q != "All" and q not in qtrs: q = "Qtr 4" if "Qtr 4" in qtrs else "All"
             controls.append(ui.input_select("s_qtr", "Select Quarter", ["All"] + qtrs, selected=q))
             
             if q != "All" and q in DB.Tree[y]:
                 months = DB.Tree[y][q]
                 with reactive.isolate():
-                    m = S_STATE['month']()
+                    m = DRAFT['month']()
                 # Ensure selected months exist in current quarter
                 final_m = [mon for mon in m if mon in months]
                 if not final_m: final_m = months
@@ -858,544 +2284,38 @@ def server(input, output, session):
         if q == "All": return y
         return f"{y} {q}" + (f" ({len(m)})" if m else "")
 
-    def stylize(fig):
-        fig.update_layout(
-            template="plotly_white",
-            margin=dict(l=10, r=10, t=30, b=40),
-            font=dict(family="Inter, sans-serif", color="#334155", size=9),
-            legend=dict(
-                orientation="h",
-                yanchor="bottom",
-                y=1.02,
-                xanchor="center",
-                x=0.5,
-                title_text='',
-                font=dict(size=8)
-            ),
-            hoverlabel=dict(
-                bgcolor="white",
-                font_size=10,
-                font_family="Inter, sans-serif"
-            )
-        )
-        fig.update_xaxes(showline=True, linecolor="#e2e8f0", gridcolor="#f1f5f9")
-        fig.update_yaxes(showline=True, linecolor="#e2e8f0", gridcolor="#f1f5f9")
-        return fig
-
-    # --- TAB 1 (Summary) ---
-    @render_plotly
-    def plt_trend():
-        df = f_leave().copy()
-        if df.empty or 'dt' not in df.columns: return px.bar()
-        df = df[df['status'].isin(['Approved', 'Open'])]
-        if df.empty: return px.bar()
-        
-        # 0. Prep columns
-        df['Month_Year'] = df['dt'].dt.strftime('%b %Y')
-        # Sort by actual date and filter by period strictly
-        y, q, m = S_STATE['year'](), S_STATE['qtr'](), S_STATE['month']()
-        
-        if y != "All":
-            if q != "All":
-                target_months = m if (m and len(m) > 0) else DB.Tree[y][q]
-            else:
-                target_months = [mon for qtr in DB.Tree[y] for mon in DB.Tree[y][qtr]]
-            
-            trend_keys = [f"{mon[:3]} {y}" for mon in target_months]
-            df = df[df['Month_Year'].isin(trend_keys)]
-        
-        if df.empty: return px.bar()
-        
-        # Determine sorted month order from calendar table for consistent X-axis
-        dt_df = filter_df(DB.DF.get('date_table', pd.DataFrame()))
-        dt_df['Month_Year'] = pd.to_datetime(dt_df['dt']).dt.strftime('%b %Y')
-        month_order = dt_df.sort_values('dt')['Month_Year'].unique().tolist()
+    # --- Charts (Rendered once per session; filter changes then patch the live figure widgets in place) ---
+    def create_chart(id):
+        # The widget is rendered once, empty; every figure (the first one too) is built by the background
+        # task and patched into it
+        @output(id=id)
+        @render_plotly
+        def _chart():
+            return chart()
 
-        if df.empty:
-            c = pd.DataFrame(columns=['Month_Year', 'Leave Application Category', 'Count'])
-        else:
-            c = df.groupby(['Month_Year', 'Leave Application Category'], sort=False).size().reset_index(name='Count')
-        
-        # Ensure all months in month_order are present in c, even if zero
-        if month_order:
-            all_cats = ["Applied Before Availing", "Applied Post Availing"]
-            template = pd.DataFrame([(m, cat) for m in month_order for cat in all_cats], columns=['Month_Year', 'Leave Application Category'])
-            c = template.merge(c, on=['Month_Year', 'Leave Application Category'], how='left').fillna(0)
-
-        fig = px.bar(c, x='Month_Year', y='Count', color='Leave Application Category', barmode='group', text_auto=True, 
-                     color_discrete_map={"Applied Before Availing": "#00adef", "Applied Post Availing": "#1f3d7a"},
-                     custom_data=['Month_Year', 'Leave Application Category'])
-        fig.update_layout(xaxis={'categoryorder':'array', 'categoryarray': month_order},
-                          xaxis_title=None, yaxis_title="App Count",
-                          bargap=0.3, # Adjust for narrow columns
-                          clickmode='event')
-        fig.update_traces(
-            textfont=dict(size=9, weight="bold"),
-            hovertemplate="<b>%{x}</b><br>Category: %{customdata[1]}<br>Count: %{y}<br><i>Click to Drill Through</i><extra></extra>"
-        )
-        return stylize(fig)
+        figure = background(build_figure, lambda: (id, filter_state(id)))
 
-    @render_plotly
-    def plt_util():
-        df = f_leave().copy()
-        if df.empty or 'dt' not in df.columns: return px.line()
-        df = df[df['status'].isin(['Approved', 'Open'])]
-        if df.empty: return px.line()
+        @reactive.effect
+        def _patch():
+            fig, widget = figure(), _chart.widget
+            if widget is not None: patch_figure(widget, fig)
 
-        # 0. Prep columns
-        df['Month_Year'] = df['dt'].dt.strftime('%b %Y')
-        
-        # 1. Filter by period strictly
-        y, q, m = S_STATE['year'](), S_STATE['qtr'](), S_STATE['month']()
-        if y != "All":
-            if q != "All":
-                target_months = m if (m and len(m) > 0) else DB.Tree[y][q]
-            else:
-                target_months = [mon for qtr in DB.Tree[y] for mon in DB.Tree[y][qtr]]
-            
-            trend_keys = [f"{mon[:3]} {y}" for mon in target_months]
-            df = df[df['Month_Year'].isin(trend_keys)]
+        return _chart
 
-        if df.empty: return px.line()
-        
-        # 2. Total Leave Hours calculation
-        h_col = 'Total Leave hrs' if 'Total Leave hrs' in df.columns else ('total_leave_hrs' if 'total_leave_hrs' in df.columns else None)
-        if h_col:
-            df['Hours'] = df[h_col].fillna(0).astype(float)
-        else:
-            val_col = 'Total Leave Days' if 'Total Leave Days' in df.columns else 'total_leave_days'
-            df['Hours'] = df[val_col].fillna(0).astype(float) * 8
-            
-        res_leave = df.groupby('Month_Year', sort=False)['Hours'].sum().reset_index(name='Total Leave Hours')
-
-        # 3. Monthly Capacity calculation (Active EMP * 8 * Working Days)
-        dt_df = filter_df(DB.DF.get('date_table', pd.DataFrame()))
-        if dt_df.empty: return px.line()
-        
-        # Map date_table to Month_Year
-        dt_df['Month_Year'] = pd.to_datetime(dt_df['dt']).dt.strftime('%b %Y')
-        res_wd = dt_df[dt_df['IsWorkingDay'] == 1].groupby('Month_Year').size().reset_index(name='Working Days')
-        
-        # Active Employees (Filtered by current slicers via filter_df)
-        active_emp_count = len(filter_df(DB.DF['users_details']))
-        
-        # 4. Merge and Calculate Impact (Left join from Working Day calendar to keep all months)
-        res = res_wd.merge(res_leave, on='Month_Year', how='left').fillna(0)
-        res['Active EMP'] = active_emp_count
-        res['Total Available Org Hours'] = res['Active EMP'] * 8 * res['Working Days']
-        res['Leave Impact %'] = (res['Total Leave Hours'] / res['Total Available Org Hours'].replace(0, 1)) * 100
-        
-        # Determine sorted month order from calendar data for X-axis
-        month_order = dt_df.sort_values('dt')['Month_Year'].unique().tolist()
-        
-        fig = px.line(res, x='Month_Year', y='Leave Impact %', text=res['Leave Impact %'].map('{:.2f}%'.format), markers=True,
-                      custom_data=['Month_Year', 'Total Leave Hours', 'Total Available Org Hours', 'Working Days'])
-        
-        tooltip = (
-            "<b>%{customdata[0]}</b><br>" +
-            "Total Leave Hours: %{customdata[1]:.2f}<br>" +
-            "Working Days: %{customdata[3]}<br>" +
-            "Total Available Org Hours: %{customdata[2]:,.0f}<br>" +
-            "Leave Impact %: %{y:.2f}%<br>" +
-            "<i>Click to Drill Through</i><extra></extra>"
-        )
-        
-        fig.update_traces(line=dict(color="#00adef", width=2), textposition='top center', 
-                          textfont=dict(size=9, weight="bold"),
-                          hovertemplate=tooltip)
-        fig.update_yaxes(ticksuffix="%", griddash="dot")
-        fig.update_layout(xaxis={'categoryorder':'array', 'categoryarray': month_order},
-                          xaxis_title=None, yaxis_title="Impact %",
-                          clickmode='event')
-        return stylize(fig)
-
-    @render_plotly
-    def plt_top():
-        df = f_leave().copy()
-        if df.empty: return px.bar()
-        
-        # 1. Filter: Valid Status (Strictly following DAX Logic)
-        # DAX Logic: Status IN {"Approved", "Open"}
-        un = df[df['status'].isin(['Approved', 'Open'])]
-        if un.empty: return px.bar(title="No Approved/Open Leaves Found")
-            
-        val_col = 'Total Leave Days' if 'Total Leave Days' in un.columns else 'total_leave_days'
-        
-        # 2. Aggregate Metrics (Matching Original Logic)
-        top = un.groupby('employee_name_t').agg(**{
-            "Leave Instances": ('user_id', 'count'), 
-            "Leave Days": (val_col, 'sum')
-        }).reset_index()
-        
-        # 3. Select Top 10 Employees with highest Leave Instances
-        top = top.sort_values(['Leave Instances', 'Leave Days'], ascending=[False, False]).head(10)
-        
-        # 4. Melt for Stacked Bar Chart
-        m = top.melt(id_vars='employee_name_t', value_vars=['Leave Instances', 'Leave Days'], 
-                     var_name='Metric', value_name='Value')
-        
-        # Text labels (int for instances, .1f for days)
-        m['txt'] = m.apply(lambda r: f"{int(r['Value'])}" if r['Metric'] == 'Leave Instances' else f"{r['Value']:.1f}", axis=1)
-        
-        fig = px.bar(m, y='employee_name_t', x='Value', color='Metric', 
-                     barmode='stack', orientation='h', 
-                     text='txt',
-                     color_discrete_map={"Leave Instances": "#5FB6FF", "Leave Days": "#1f3d7a"},
-                     custom_data=['employee_name_t', 'Metric'])
-        
-        # Apply global styles first
-        fig = stylize(fig)
-
-        # Override for precision alignment
-        fig.update_layout(
-            xaxis_title="Instances / Total Days",
-            yaxis_title="",
-            yaxis={
-                'categoryorder':'array', 
-                'categoryarray': top['employee_name_t'].tolist()[::-1],
-                'automargin': True
-            },
-            margin=dict(l=0, r=10, t=10, b=40), # FLUSH LEFT: Override global 5px left margin
-            legend_title="",
-            legend=dict(
-                orientation="h", 
-                yanchor="bottom", 
-                y=1.02, 
-                xanchor="center", 
-                x=0.5
-            ),
-            clickmode='event'
-        )
-        fig.update_traces(
-            textfont=dict(size=10, weight="bold"),
-            hovertemplate="<b>%{y}</b><br>%{customdata[1]}: %{x}<br><i>Click to Drill Through</i><extra></extra>"
-        )
-        return fig
+    # --- TAB 1 (Summary) ---
+    _plt_trend = create_chart('plt_trend')
+    _plt_util = create_chart('plt_util')
+    _plt_top = create_chart('plt_top')
 
     # --- TAB 2 (Analysis) ---
-    @render_plotly
-    def plt_avail():
-        # 1. Get Base Date Range from date_table and FILTER FOR WORKING DAYS ONLY
-        dates_df = filter_df(DB.DF.get('date_table', pd.DataFrame()))
-        if dates_df.empty: return px.bar(title="No Dates in Selected Period")
-        dates_df = dates_df[dates_df['IsWorkingDay'] == 1]
-        if dates_df.empty: return px.bar(title="No Working Days in Selected Period")
-        
-        # 2. Get Leave Data
-        leaves_df = f_leave().copy()
-        leaves_df = leaves_df[leaves_df['status'].isin(['Approved', 'Open'])]
-        
-        # 3. Get Filtered Total Employee Count
-        u_filt = filter_df(DB.DF['users_details'])
-        total_count = len(u_filt['user_id'].unique()) if not u_filt.empty else 0
-        
-        # 4. Map Leaves to Dates
-        expanded = []
-        if not leaves_df.empty:
-            for _, r in leaves_df.iterrows():
-                try:
-                    for d in pd.date_range(r['from_date'], r['to_date']):
-                        expanded.append({'Date': d})
-                except: pass
-        
-        on_leave_counts = pd.DataFrame(expanded).groupby('Date').size().reset_index(name='Employees on Leave') if expanded else pd.DataFrame(columns=['Date', 'Employees on Leave'])
-        on_leave_counts['Date'] = pd.to_datetime(on_leave_counts['Date']).dt.normalize()
-        
-        # 5. Join to Base Date Range
-        base = dates_df[['dt']].copy().rename(columns={'dt': 'Date'})
-        base['Date'] = base['Date'].dt.normalize()
-        
-        res = base.merge(on_leave_counts, on='Date', how='left').fillna(0)
-        res['Available Employees'] = (total_count - res['Employees on Leave']).clip(lower=0)
-        
-        # 6. Plot Side-by-Side Bars
-        # Use full "Day Month" for categorical ID (separate months), but override display with day only.
-        res['DayLabel'] = res['Date'].dt.strftime('%d %b')
-        res['DayNum'] = res['Date'].dt.strftime('%d').str.lstrip('0')
-            
-        m = res.melt(id_vars=['Date', 'DayLabel', 'DayNum'], value_vars=['Available Employees', 'Employees on Leave'], 
-                     var_name='Category', value_name='Count')
-        
-        fig = px.bar(m, x='DayLabel', y='Count', color='Category', barmode='group', text_auto=True,
-                     color_discrete_map={"Available Employees": "#00adef", "Employees on Leave": "#1f3d7a"},
-                     custom_data=['Date', 'Category'])
-        
-        # Add background highlights for alternating months (#cccccc for 1st, 3rd, etc.)
-        # and vertical dotted lines between months
-        unique_m = m.sort_values('Date').drop_duplicates('DayLabel').reset_index(drop=True)
-        unique_days = unique_m['Date'].tolist()
-        
-        month_bounds = []
-        current_start = 0
-        for i in range(1, len(unique_days)):
-            if unique_days[i].month != unique_days[i-1].month:
-                month_bounds.append((current_start, i - 1))
-                current_start = i
-                # Keep the divider line
-                fig.add_vline(x=i - 0.5, line_dash="dash", line_color="#64748b", line_width=1.5)
-        month_bounds.append((current_start, len(unique_days) - 1))
-        
-        # Apply highlights to 1st, 3rd, 5th months
-        for idx, (start, end) in enumerate(month_bounds):
-            if idx % 2 == 0:
-                fig.add_vrect(
-                    x0=start - 0.5, x1=end + 0.5,
-                    fillcolor="#cccccc", opacity=0.4,
-                    layer="below", line_width=0
-                )
-        
-        # Add centered month labels below the axis
-        month_groups = unique_m.groupby(unique_m['Date'].dt.to_period('M'))
-        for period, group in month_groups:
-            mid_x = group.index.to_series().mean()
-            fig.add_annotation(
-                text=period.strftime('%B %Y'),
-                x=mid_x, y=-0.12, # Closer to axis
-                xref="x", yref="paper",
-                showarrow=False,
-                font=dict(size=11, color="#1e293b"), # Removed weight="bold"
-                align="center"
-            )
-
-        fig.update_layout(xaxis_title="", yaxis_title="Employee Count", 
-                          margin=dict(b=80), # Space for both labels
-                          xaxis=dict(
-                              type='category',
-                              tickvals=unique_m['DayLabel'].tolist(),
-                              ticktext=unique_m['DayNum'].tolist(),
-                              showgrid=False, # Remote vertical lines
-                              categoryorder='array',
-                              categoryarray=unique_m['DayLabel'].tolist()
-                          ), 
-                          clickmode='event',
-                          yaxis=dict(
-                              range=[0, total_count * 1.15],
-                              showgrid=False # Remove horizontal lines
-                          )) # Padding for outside text
-        
-        # Add central "Day of Month" title at the bottom
-        fig.add_annotation(
-            text="Day of Month",
-            x=0.5, y=-0.25, # Positioned below month labels
-            xref="paper", yref="paper",
-            showarrow=False,
-            font=dict(size=12, color="#1e293b", weight="bold"),
-            align="center"
-        )
-        
-        fig.update_traces(
-            textfont=dict(size=10, weight="bold"),
-            hovertemplate="<b>%{x}</b><br>Category: %{customdata[1]}<br>Count: %{y}<br><i>Click to Drill Through</i><extra></extra>"
-        )
-        
-        return stylize(fig)
-
-    @render.table
-    def tbl_matrix():
-        df = f_leave()
-        if df.empty or 'department_name_t' not in df.columns: return pd.DataFrame()
-        
-        val_col = 'Total Leave Days' if 'Total Leave Days' in df.columns else 'total_leave_days'
-        
-        # Pivot by Department, Sum of days
-        p = df.pivot_table(index='leave_type', columns='department_name_t', values=val_col, aggfunc='sum', fill_value=0)
-        
-        # Clear index names to prevent rogue headers in some renderers
-        p.index.name = None
-        p.columns.name = None
-        
-        # Add Totals
-        p.loc['Total'] = p.sum()
-        p['Total'] = p.sum(axis=1)
-        
-        # Format decimals
-        p = p.map(lambda x: f"{x:.2f}" if x != 0 else "")
-        
-        res = p.reset_index().rename(columns={'index': 'Leave type'})
-        return res
+    _plt_avail = create_chart('plt_avail')
 
+    tbl_matrix = background(run_query, lambda: ('tbl_matrix', filter_state('tbl_matrix')))
 
     # --- TAB 3 (Attendance) ---
-    @render_plotly
-    def plt_daily_att():
-        df = f_att().copy()
-        if df.empty or 'dt' not in df.columns: return px.bar()
-        
-        # Merge with date_table to filter only working days
-        dt_ref = DB.DF['date_table'][['dt', 'IsWorkingDay']].copy()
-        dt_ref['dt'] = pd.to_datetime(dt_ref['dt']).dt.normalize()
-        df['dt_norm'] = df['dt'].dt.normalize()
-        
-        df = df.merge(dt_ref, left_on='dt_norm', right_on='dt', how='inner', suffixes=('', '_ref'))
-        df = df[df['IsWorkingDay'] == 1]
-        
-        if df.empty: return px.bar(title="No Attendance on Working Days")
-        
-        # Sort and create day labels
-        df = df.sort_values('dt')
-        # Use full "Day Month" for categorical ID (separate months), but override display with day only.
-        df['DayLabel'] = df['dt'].dt.strftime('%d %b')
-        df['DayNum'] = df['dt'].dt.strftime('%d').str.lstrip('0')
-            
-        df['presence_type'] = df['presence_type'].fillna('').replace('', 'On Leave')
-            
-        c = df.groupby(['dt_norm', 'DayLabel', 'DayNum', 'presence_type'], sort=False).size().reset_index(name='Count')
-        
-        # Consistent color map
-        colors = {
-            "Work From Office": "#00d28d", 
-            "Work From Home": "#ff5a5f", 
-            "On Duty": "#5c7cfa", 
-            "Work From Anywhere": "#ffa94d", 
-            "Missed Entry": "#be4bdb",
-            "On Leave": "#1f3d7a"
-        }
-        
-        fig = px.bar(c, x='DayLabel', y='Count', color='presence_type', barmode='stack', text_auto=True,
-                     color_discrete_map=colors,
-                     custom_data=['dt_norm', 'presence_type'])
-        
-        # Add background highlights for alternating months (#cccccc for 1st, 3rd, etc.)
-        # and vertical dotted lines between months
-        unique_m = c.sort_values('dt_norm').drop_duplicates('DayLabel').reset_index(drop=True)
-        unique_days = unique_m['dt_norm'].tolist()
-        
-        month_bounds = []
-        current_start = 0
-        for i in range(1, len(unique_days)):
-            if pd.to_datetime(unique_days[i]).month != pd.to_datetime(unique_days[i-1]).month:
-                month_bounds.append((current_start, i - 1))
-                current_start = i
-                # Keep the divider line
-                fig.add_vline(x=i - 0.5, line_dash="dash", line_color="#64748b", line_width=1.5)
-        month_bounds.append((current_start, len(unique_days) - 1))
-        
-        # Apply highlights to 1st, 3rd, 5th months
-        for idx, (start, end) in enumerate(month_bounds):
-            if idx % 2 == 0:
-                fig.add_vrect(
-                    x0=start - 0.5, x1=end + 0.5,
-                    fillcolor="#cccccc", opacity=0.4,
-                    layer="below", line_width=0
-                )
-        
-        # Add centered month labels below the axis
-        month_groups = unique_m.groupby(unique_m['dt_norm'].dt.to_period('M'))
-        for period, group in month_groups:
-            mid_x = group.index.to_series().mean()
-            fig.add_annotation(
-                text=period.strftime('%B %Y'),
-                x=mid_x, y=-0.12, # Closer to axis
-                xref="x", yref="paper",
-                showarrow=False,
-                font=dict(size=11, color="#1e293b"),
-                align="center"
-            )
-
-        fig.update_layout(xaxis_title="", yaxis_title="Count", 
-                          margin=dict(b=80), 
-                          xaxis=dict(
-                              type='category',
-                              tickvals=unique_m['DayLabel'].tolist(),
-                              ticktext=unique_m['DayNum'].tolist(),
-                              categoryorder='array',
-                              categoryarray=unique_m['DayLabel'].tolist(),
-                              showgrid=False # Remote vertical lines
-                          ), 
-                          clickmode='event')
-        
-        # Add central "Day of Month" title at the bottom
-        fig.add_annotation(
-            text="Day of Month",
-            x=0.5, y=-0.25, # Positioned below month labels
-            xref="paper", yref="paper",
-            showarrow=False,
-            font=dict(size=12, color="#1e293b", weight="bold"),
-            align="center"
-        )
-        fig.update_traces(
-            textposition='inside', textfont=dict(size=9, weight="bold"), textangle=0, cliponaxis=False,
-            hovertemplate="<b>%{x}</b><br>Type: %{customdata[1]}<br>Count: %{y}<br><i>Click to Drill Through</i><extra></extra>"
-        )
-        return stylize(fig)
-
-    @render_plotly
-    def plt_hrs_dist():
-        df = f_att().copy()
-        if df.empty: return px.bar()
-        
-        # 1. Filter: Presence Type = "Work From Office" (Active already filtered in f_att)
-        df = df[df['presence_type'] == 'Work From Office']
-        if df.empty or 'working_hours' not in df.columns: return px.bar(title="No WFO Data")
-        
-        # 2. Row-level Bucketing (DAX logic)
-        def get_bucket(h):
-            if pd.isna(h): return None
-            if h < 3: return "< 3 hours"
-            if h < 6: return "3-6 hours"
-            return "6+ hours"
-        
-        df['Office Hrs Bucket'] = df['working_hours'].apply(get_bucket)
-        df = df.dropna(subset=['Office Hrs Bucket'])
-        
-        # 3. Aggregate: X = Bucket, Y = Distinct Count of Employees, Tooltip = Avg Hours
-        order = ['< 3 hours', '3-6 hours', '6+ hours']
-        res = df.groupby('Office Hrs Bucket').agg(
-            Total_Emp_WFO=('employee_name_t', 'nunique'),
-            Avg_Office_Hours=('working_hours', 'mean')
-        ).reindex(order).reset_index()
-        
-        fig = px.bar(res, x='Office Hrs Bucket', y='Total_Emp_WFO', 
-                     text_auto=True,
-                     custom_data=['Office Hrs Bucket', 'Avg_Office_Hours'],
-                     color_discrete_sequence=["#00adef"])
-        
-        fig.update_traces(
-            textfont=dict(size=10, weight="bold"),
-            hovertemplate="<b>%{x}</b><br>Total Emp WFO: %{y}<br>Avg Office Hours: %{customdata[1]:.2f}h<br><i>Click to Drill Through</i><extra></extra>"
-        )
-        
-        fig.update_layout(xaxis_title="Office Hrs Bucket", yaxis_title="Total Emp WFO", clickmode='event', bargap=0.6)
-        return stylize(fig)
-
-    @render_plotly
-    def plt_wfh_comp():
-        df = f_att().copy()
-        if df.empty or 'dt' not in df.columns: return px.bar()
-        
-        # 1. Month-Year Key
-        df['Month_Year'] = df['dt'].dt.strftime('%b %Y')
-        
-        # 2. Daily WFH Calculation per Employee per Month - VECTORIZED for speed
-        df['dt_norm'] = df['dt'].dt.normalize()
-        wfh_counts = df[df['presence_type'] == 'Work From Home'].groupby(['Month_Year', 'user_id'])['dt_norm'].nunique().reset_index(name='WFH_Days')
-        
-        # Get all active users per month to include those with 0 WFH days (essential for parity)
-        all_users_month = df.groupby(['Month_Year', 'user_id']).size().reset_index()[['Month_Year', 'user_id']]
-        emp_stats = all_users_month.merge(wfh_counts, on=['Month_Year', 'user_id'], how='left').fillna(0)
-        
-        # 3. Apply Bucket (DAX logic: > 9)
-        emp_stats['WFH Bucket'] = emp_stats['WFH_Days'].apply(lambda x: "WFH > 9" if x > 9 else "WFH <= 9")
-        
-        # Chronological Sort
-        df_sorted = df.sort_values('dt')
-        month_order = df_sorted['Month_Year'].unique().tolist()
-        
-        c = emp_stats.groupby(['Month_Year', 'WFH Bucket']).size().reset_index(name='Distinct_Employees')
-        
-        fig = px.bar(c, x='Month_Year', y='Distinct_Employees', color='WFH Bucket', barmode='group', text_auto=True,
-                     color_discrete_map={"WFH > 9": "#ff5a5f", "WFH <= 9": "#1c7ed6"},
-                     custom_data=['Month_Year', 'WFH Bucket'])
-        
-        fig.update_layout(xaxis={'categoryorder':'array', 'categoryarray': month_order},
-                          xaxis_title="Month", yaxis_title="Total Count",
-                          clickmode='event')
-        
-        fig.update_traces(
-            textfont=dict(size=10, weight="bold"),
-            hovertemplate="<b>%{x}</b><br>Bucket: %{customdata[1]}<br>Count: %{y}<br><i>Click to Drill Through</i><extra></extra>"
-        )
-        return stylize(fig)
+    _plt_daily_att = create_chart('plt_daily_att')
+    _plt_hrs_dist = create_chart('plt_hrs_dist')
+    _plt_wfh_comp = create_chart('plt_wfh_comp')
 
     # --- DRILL THROUGH SECTION ---
     
@@ -1416,7 +2336,8 @@ def server(input, output, session):
         if click_data and 'points' in click_data:
             pt = click_data['points'][0]
             if 'customdata' in pt:
-                DRILL_DATA.set({'type': 'WFH', 'month': pt['customdata'][0], 'bucket': pt['customdata'][1]})
+                cd = expand_custom(_plt_wfh_comp.widget.layout.meta, pt['customdata'])
+                DRILL_DATA.set({'type': 'WFH', 'month': cd[0], 'bucket': cd[1]})
                 ui.update_navset("tabs", selected="Attendance Drill Details")
 
     @reactive.effect
@@ -1426,7 +2347,8 @@ def server(input, output, session):
         if click_data and 'points' in click_data:
             pt = click_data['points'][0]
             if 'customdata' in pt:
-                DRILL_DATA.set({'type': 'DAILY', 'date': pt['customdata'][0], 'bucket': pt['customdata'][1]})
+                cd = expand_custom(_plt_daily_att.widget.layout.meta, pt['customdata'])
+                DRILL_DATA.set({'type': 'DAILY', 'date': cd[0], 'bucket': cd[1], **({'date_to': cd[2]} if len(cd) > 2 else {})})
                 ui.update_navset("tabs", selected="Attendance Drill Details")
 
     @render.text
@@ -1439,23 +2361,22 @@ def server(input, output, session):
         
         period = ""
         if d.get('type') == 'DAILY' and d.get('date'):
-            period = f" for {pd.to_datetime(d['date']).strftime('%d %b %Y')}"
+            period = f" for {date_span(d)}"
         elif d.get('month'):
             period = f" for {d['month']}"
             
         return f"Drill Details: {mode} ({d['bucket']}){period}"
 
-    @render.table
-    def tbl_drill():
-        d = DRILL_DATA()
+    def build_drill(d, st):
+        """Attendance drill table of payload `d` under the dataset filter states `st`."""
         if not d['bucket']: return pd.DataFrame()
         
         # 1. Get filtered base data
-        df_base = f_att().copy()
+        df_base = filtered('attendance', st['attendance'])
         if df_base.empty or 'dt' not in df_base.columns: return pd.DataFrame()
         
         # 2. Setup Metadata from UD
-        ud = DB.DF['users_details'][['user_id', 'employee_id', 'employee_name', 'department_name', 'designation']].copy()
+        ud = DB.DF['users_details'][['user_id', 'employee_id', 'employee_name', 'department_name', 'designation']]
         ud = ud.rename(columns={'employee_id': 'EmployeeID'})
         for col in ['employee_name', 'department_name', 'designation']:
             if col in ud.columns: ud[col] = ud[col].astype(str).str.title().str.strip()
@@ -1463,43 +2384,37 @@ def server(input, output, session):
         # 3. Mode Processing
         if d.get('type') == 'DAILY':
             # DAILY Mode (Filter by exact date and presence type)
-            # Use string-based comparison for robustness against timestamp nuances
-            target_date_str = pd.to_datetime(d['date']).strftime('%Y-%m-%d')
-            df_m = df_base[pd.to_datetime(df_base['dt']).dt.strftime('%Y-%m-%d') == target_date_str].copy()
+            # Served from the daily presence cube (binary-searched day): one row per counted attendance record
+            cube = drill_rows('daily_presence', st['daily_presence'], np.arange(*DB.date_slice('daily_presence', d['date'], d.get('date_to') or d['date'])))
             
             # Robust presence_type matching
-            res = df_m[df_m['presence_type'].astype(str).str.strip() == str(d['bucket']).strip()].copy()
+            hit = cube[cube['presence_type'].astype(str).str.strip() == str(d['bucket']).strip()]
+            res = DB.attach(hit.loc[hit.index.repeat(hit['Count'])], 'user_id')
             metric_col = "Presence Type"
             res[metric_col] = res['presence_type']
+            # Weekly / monthly bars: one row per counted day, so show which day
+            if d.get('date_to'): res['Date'] = pd.to_datetime(res['date_key'], unit='D').dt.strftime('%d %b %Y')
             
         elif d.get('type') == 'HRS':
             # OFFICE HOURS Mode
-            df_m = df_base[df_base['presence_type'] == 'Work From Office'].copy()
-            if df_m.empty: return pd.DataFrame()
-            res = df_m.groupby('user_id').agg(Metric_Value=('working_hours', 'mean')).reset_index()
-            def get_bucket(h):
-                if pd.isna(h): return None
-                if h < 3: return "< 3 hours"
-                if h < 6: return "3-6 hours"
-                return "6+ hours"
-            res['Bucket'] = res['Metric_Value'].apply(get_bucket)
-            res = res[res['Bucket'] == d['bucket']]
+            # Mean WFO hours per employee, rolled up from the office-hours summary
+            hrs = filtered('office_hours', st['office_hours'])
+            if hrs.empty: return pd.DataFrame()
+            res = hrs.groupby('emp_key')[['hours_sum', 'hours_count']].sum()
+            res = res.assign(Metric_Value=res['hours_sum'] / res['hours_count']).reset_index()
+            res = DB.attach(res[hours_bucket(res['Metric_Value']) == d['bucket']], 'user_id')
             metric_col = "Avg Office Hours"
             res[metric_col] = res['Metric_Value']
         else:
             # WFH Mode
             if not d.get('month'): return pd.DataFrame()
-            df_base['Month_Year'] = df_base['dt'].dt.strftime('%b %Y')
-            df_m = df_base[df_base['Month_Year'] == d['month']].copy()
-            if df_m.empty: return pd.DataFrame()
-            df_m['dt_norm'] = df_m['dt'].dt.normalize()
-            wfh_counts = df_m[df_m['presence_type'] == 'Work From Home'].groupby('user_id')['dt_norm'].nunique().reset_index(name='Metric_Value')
-            all_u = pd.DataFrame({'user_id': df_m['user_id'].unique()})
-            res = all_u.merge(wfh_counts, on='user_id', how='left').fillna(0)
-            res['Bucket'] = res['Metric_Value'].apply(lambda x: "WFH > 9" if x > 9 else "WFH <= 9")
-            res = res[res['Bucket'] == d['bucket']]
+            # Served from the shared per-employee monthly WFH table
+            wfh = derived('monthly_wfh', st['monthly_wfh'])
+            if wfh.empty: return pd.DataFrame()
+            res = wfh[(wfh['Month_Year'] == d['month']) & (wfh['WFH Bucket'] == d['bucket'])]
+            res = DB.attach(res, 'user_id')
             metric_col = "WFH Days"
-            res[metric_col] = res['Metric_Value']
+            res[metric_col] = res['wfh_days'].astype(int)  # Day counts (stored as float in the monthly table)
 
         # 4. Merge Metadata & Format
         # Drop existing identification columns to avoid collisions during merge
@@ -1519,9 +2434,12 @@ def server(input, output, session):
         final_cols = ['Employee ID', 'Employee Name', 'User ID', 'Department', 'Designation', metric_col]
         # For Daily mode, we show ALL records to match chart row count. For aggregations, we drop unique.
         if d.get('type') == 'DAILY':
-            return res[final_cols].sort_values(['Employee Name'])
+            if 'Date' in res.columns: final_cols.insert(-1, 'Date')
+            return res[final_cols].sort_values(['Employee Name'], kind='stable')
         return res[final_cols].drop_duplicates('User ID').sort_values([metric_col, 'Employee Name'], ascending=[False, True])
 
+    tbl_drill = background(build_drill, lambda: drill_inputs(DRILL_DATA, 'attendance', 'daily_presence', 'office_hours', 'monthly_wfh'))
+
     @reactive.effect
     @reactive.event(input.leave_drill_event)
     def _drill_leave_js():
@@ -1539,63 +2457,27 @@ def server(input, output, session):
         if d.get('type') == 'plt_top':
             period = f" for {d.get('bucket')}"
         elif d.get('date'):
-            period = f" for {pd.to_datetime(d['date']).strftime('%d %b %Y')}"
+            period = f" for {date_span(d)}"
         elif d.get('month'):
             period = f" for {d['month']}"
             
         return f"Leave Details ({d['bucket']}){period}"
 
-    @render.table
-    def tbl_leave_drill():
-        d = LEAVE_DRILL_DATA()
+    def build_leave_drill(d, st):
+        """Leave drill table of payload `d` under the dataset filter states `st`."""
         if not d['bucket']: return pd.DataFrame()
+        state = st['leave_applications']
         
-        # 1. Base Data
-        df = f_leave().copy()
-        if df.empty: return pd.DataFrame()
-        
-        # 2. Filtering
-        if d.get('type') == 'plt_avail':
-            # Cast both to naive normalized timestamps for robust comparison
-            target_date = pd.to_datetime(d['date']).replace(tzinfo=None).normalize()
-            if d['bucket'] == 'Employees on Leave':
-                df = df[df['status'].isin(['Approved', 'Open'])]
-                # Ensure series are naive before comparison
-                s_from = pd.to_datetime(df['from_date']).dt.tz_localize(None).dt.normalize()
-                s_to = pd.to_datetime(df['to_date']).dt.tz_localize(None).dt.normalize()
-                mask = (s_from <= target_date) & (s_to >= target_date)
-                res = df[mask].copy()
-            else:
-                return pd.DataFrame()
-        
-        elif d.get('type') == 'plt_trend':
-            df['Month_Year'] = df['dt'].dt.strftime('%b %Y')
-            res = df[(df['Month_Year'] == d['month']) & (df['Leave Application Category'] == d['bucket'])].copy()
-            res = res[res['status'].isin(['Approved', 'Open'])]
-
-        elif d.get('type') == 'plt_util':
-            df['Month_Year'] = df['dt'].dt.strftime('%b %Y')
-            res = df[df['Month_Year'] == d['month']].copy()
-            res = res[res['status'].isin(['Approved', 'Open'])]
-
-        elif d.get('type') == 'plt_top':
-            # bucket here is the employee name (customdata[0]) if we changed payload logic, 
-            # but wait, JS set bucket = customdata[1] || customdata[0]
-            # For plt_top, customdata[0] is name, customdata[1] is metric.
-            emp_name = d.get('month') # Wait, check JS bridge payload mapping
-            # In JS: bucket: pt.customdata[1] || pt.customdata[0], month: pt.customdata[0] for trend.
-            # For plt_top: pt.customdata is [name, metric].
-            # payload.bucket = metric, payload.month = name.
-            res = df[df['employee_name_t'] == d.get('month')].copy()
-            res = res[res['status'].isin(['Approved', 'Open'])]
-            
-        else:
-            res = df.copy()
+        # 1-2. Indexed lookup of the clicked point (leaves covering a day, of a month or of an employee)
+        # For plt_top: pt.customdata is [name, metric] -> payload.bucket = metric, payload.month = name.
+        if d.get('type') == 'plt_avail' and d['bucket'] != 'Employees on Leave': return pd.DataFrame()
+        res = leave_drill_rows(d, state)
+        if res is None: res = filtered('leave_applications', state)
 
         if res.empty: return pd.DataFrame()
 
         # 3. Metadata Join (Ensure Employee ID and Name are accurate)
-        ud = DB.DF['users_details'][['user_id', 'employee_id', 'employee_name']].copy()
+        ud = DB.DF['users_details'][['user_id', 'employee_id', 'employee_name']]
         ud = ud.rename(columns={'employee_id': 'EmployeeID', 'employee_name': 'EmployeeName'})
         
         # Drop collision columns if they exist in res
@@ -1619,6 +2501,8 @@ def server(input, output, session):
         cols = ['Employee ID', 'Employee Name', 'User ID', 'Status', 'Leave Date', 'Total Leave Days', 'Category']
         return res[cols].sort_values('Employee Name')
 
+    tbl_leave_drill = background(build_leave_drill, lambda: drill_inputs(LEAVE_DRILL_DATA, 'leave_applications'))
+
     @reactive.effect
     @reactive.event(input.summary_drill_event)
     def _drill_summary_js():
@@ -1640,34 +2524,14 @@ def server(input, output, session):
             
         return f"Summary Details ({d['bucket']}){period}"
 
-    @render.table
-    def tbl_summary_drill():
-        d = SUMMARY_DRILL_DATA()
+    def build_summary_drill(d, st):
+        """Summary drill table of payload `d` under the dataset filter states `st`."""
         if not d['bucket']: return pd.DataFrame()
+        state = st['leave_applications']
         
-        # 1. Base Data
-        df = f_leave().copy()
-        if df.empty: return pd.DataFrame()
-        
-        # 2. Filtering
-        if d.get('type') == 'plt_trend':
-            df['Month_Year'] = df['dt'].dt.strftime('%b %Y')
-            res = df[(df['Month_Year'] == d['month']) & (df['Leave Application Category'] == d['bucket'])].copy()
-            res = res[res['status'].isin(['Approved', 'Open'])]
-
-        elif d.get('type') == 'plt_util':
-            df['Month_Year'] = df['dt'].dt.strftime('%b %Y')
-            res = df[df['Month_Year'] == d['month']].copy()
-            res = res[res['status'].isin(['Approved', 'Open'])]
-
-        elif d.get('type') == 'plt_top':
-            # Robust name matching: trim and case-insensitive
-            target_name = str(d.get('month', '')).strip().lower()
-            res = df[df['employee_name_t'].astype(str).str.strip().str.lower() == target_name].copy()
-            res = res[res['status'].isin(['Approved', 'Open'])]
-            
-        else:
-            res = df.copy()
+        # 1-2. Indexed lookup of the clicked point (leaves of a month or of an employee)
+        res = leave_drill_rows(d, state) if d.get('type') in ('plt_trend', 'plt_util', 'plt_top') else None
+        if res is None: res = filtered('leave_applications', state)
 
         if res.empty: return pd.DataFrame()
 
@@ -1682,16 +2546,16 @@ def server(input, output, session):
                 return 0.5
             return base_days
         
-        res['Calc_Leave_Days'] = res.apply(calc_days, axis=1)
-        
         # Logical Column 9: Total Leave Hours (Sum for Approved/Open)
         # (Already filtered for status above, so we just sum the column if it exists)
         h_col = 'Total Leave hrs' if 'Total Leave hrs' in res.columns else 'total_leave_hrs'
-        if h_col not in res.columns: res[h_col] = 0
-        res['Calc_Leave_Hours'] = res[h_col].fillna(0).astype(float)
+        res = res.assign(
+            Calc_Leave_Days=res.apply(calc_days, axis=1),
+            Calc_Leave_Hours=res[h_col].fillna(0).astype(float) if h_col in res.columns else 0.0
+        )
 
         # 4. Metadata Join
-        ud = DB.DF['users_details'][['user_id', 'employee_id', 'employee_name']].copy()
+        ud = DB.DF['users_details'][['user_id', 'employee_id', 'employee_name']]
         ud = ud.rename(columns={'employee_id': 'EmployeeID', 'employee_name': 'EmployeeName'})
         res = res.drop(columns=[c for c in ['employee_id', 'employee_name'] if c in res.columns], errors='ignore')
         res = res.merge(ud, on='user_id', how='left')
@@ -1713,4 +2577,11 @@ def server(input, output, session):
         ]
         return res[cols].sort_values(['Employee Name', 'From Date'])
 
+    tbl_summary_drill = background(build_summary_drill, lambda: drill_inputs(SUMMARY_DRILL_DATA, 'leave_applications'))
+
+    _grid_matrix = create_grid('tbl_matrix', tbl_matrix, footer=1)
+    _grid_drill = create_grid('tbl_drill', tbl_drill)
+    _grid_leave_drill = create_grid('tbl_leave_drill', tbl_leave_drill)
+    _grid_summary_drill = create_grid('tbl_summary_drill', tbl_summary_drill)
+
 app = App(app_ui, server)
@@ -0,0 +1,24 @@
+"""Times the figure build of every dashboard chart (from its cached input) for a few periods.
+
+Usage: python bench_charts.py [repeats]
+"""
+import sys, time
+import numpy as np
+from app import FIGURES, make_state, run_query
+
+PERIODS = {"2025 Qtr 4": ("2025", "Qtr 4"), "2025": ("2025", "All"), "All Time": ("All", "All")}
+REPEATS = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+print(f"{'chart':<15}" + "".join(f"{p:>14}" for p in PERIODS) + "   (median ms per build)")
+for output_id, build in FIGURES.items():
+    row = []
+    for year, qtr in PERIODS.values():
+        r = run_query(output_id, make_state(year, qtr, []))
+        build(r)  # warm-up
+        times = []
+        for _ in range(REPEATS):
+            t = time.perf_counter()
+            build(r)
+            times.append((time.perf_counter() - t) * 1000)
+        row.append(np.median(times))
+    print(f"{output_id:<15}" + "".join(f"{t:>14.1f}" for t in row))
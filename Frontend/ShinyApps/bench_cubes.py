@@ -0,0 +1,51 @@
+"""Times the OLAP cube answers (cell selection + roll-up) behind the dashboard charts, and each
+chart/table query computed from scratch (no result cache), for a few slicer states.
+
+Usage: python bench_cubes.py [repeats]
+"""
+import sys, time
+import numpy as np
+import app
+from app import DB, QUERIES, cube_cells, make_state, narrow
+
+REPEATS = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+first = lambda values: values[0] if values else "All"
+STATES = {
+    "All Time": make_state("All", "All", []),
+    "2025 Qtr 4": make_state("2025", "Qtr 4", []),
+    "Qtr 4, dept": make_state("2025", "Qtr 4", [], dept=first(DB.Lists['D'])),
+    "All, ws+at": make_state("All", "All", [], ws=first(DB.Lists['WS']), at=first(DB.Lists['AT'])),
+    "2025, proj+lt": make_state("2025", "All", [], proj=first(DB.Lists['PN']), lt=first(DB.Lists['LT'])),
+}
+# Roll-ups the chart queries make: cube -> (dimensions, measure)
+ROLLUPS = {
+    'leaves': (('app_ym', 'category'), 'n'),
+    'leave_days': (('date_key',), None),
+    'presence': (('date_key', 'presence_type'), 'Count'),
+    'wfh': (('month',), 'over_9'),
+    'office_hours': (('emp_key', 'Office Hrs Bucket'), None),
+}
+
+def median_ms(fn):
+    times = []
+    for _ in range(REPEATS):
+        t = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t) * 1000)
+    return np.median(times)
+
+def answer(name, state):
+    cube, (by, measure) = DB.Cube[name], ROLLUPS[name]
+    pos = cube_cells(name, state)
+    return cube.distinct(pos, by) if name == 'leave_days' else cube.rollup(pos, by, measure)
+
+header = "".join(f"{s:>15}" for s in STATES)
+print(f"{'cube':<15}{header}   (median ms per answer)")
+for name in ROLLUPS:
+    if name not in DB.Cube: continue
+    print(f"{name:<15}" + "".join(f"{median_ms(lambda: answer(name, s)):>15.3f}" for s in STATES.values()))
+
+app.CACHE = app.ResultCache(0)  # Nothing cached: every query (and intermediate) computed from scratch
+print(f"\n{'query':<15}{header}   (median ms per query)")
+for output_id, query in QUERIES.items():
+    print(f"{output_id:<15}" + "".join(f"{median_ms(lambda: query(narrow(output_id, s))):>15.2f}" for s in STATES.values()))
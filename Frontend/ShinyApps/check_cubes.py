@@ -0,0 +1,199 @@
+"""Checks the OLAP cube answers behind the dashboard charts: for random slicer states, every chart/table
+query (QUERIES) must equal a plain row scan of the rows filtered() selects from the fact tables
+(leave applications, attendance, calendar, users), grouped with pandas.
+
+Usage: python check_cubes.py [states] [seed]
+"""
+import sys, random
+import numpy as np
+import pandas as pd
+import app
+from app import (DB, QUERIES, HOURS_BUCKETS, PRESENCE_ORDER, filtered, make_state, narrow,
+                 only_active, leave_occupancy, hours_bucket, time_grain, grain_buckets)
+
+STATES = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+random.seed(int(sys.argv[2]) if len(sys.argv) > 2 else 0)
+app.CACHE = app.ResultCache(0)  # Every query answered from the cubes, not from an earlier cached result
+
+def app_month(df):
+    return df['dt'].dt.year * 12 + df['dt'].dt.month - 1
+
+def leaves_in_app_months(state):
+    """Approved/Open leave applications, filtered by application month strictly as well."""
+    df = only_active(filtered('leave_applications', state))
+    if df.empty or state.months is None: return df
+    return df[app_month(df).isin(state.months)]
+
+def leave_days(df):
+    return df['Total Leave Days'] if 'Total Leave Days' in df.columns else df['total_leave_days']
+
+def calendar(state):
+    return filtered('date_table', state)
+
+def headcount(state):
+    return len(filtered('users_details', state))
+
+def attendance(state):
+    """Dated attendance rows selected by `state`."""
+    att = filtered('attendance', state)
+    return att[att['dt'].notna()] if not att.empty else att
+
+def ref_plt_trend(state):
+    df = leaves_in_app_months(state)
+    if df.empty: return {}
+    dt_df = calendar(state)
+    month_order = dt_df['dt'].dt.strftime('%b %Y').unique().tolist() if not dt_df.empty else []
+    c = df.assign(Month_Year=df['dt'].dt.strftime('%b %Y')).groupby(
+        ['Month_Year', 'Leave Application Category'], sort=False, observed=True).size().reset_index(name='Count')
+    if month_order:
+        template = pd.DataFrame([(m, k) for m in month_order for k in ["Applied Before Availing", "Applied Post Availing"]],
+                                columns=['Month_Year', 'Leave Application Category'])
+        c = template.merge(c, on=['Month_Year', 'Leave Application Category'], how='left').fillna(0)
+    return {'c': c, 'month_order': month_order}
+
+def ref_plt_util(state):
+    df = leaves_in_app_months(state)
+    if df.empty: return {}
+    h_col = next((c for c in ('Total Leave hrs', 'total_leave_hrs') if c in df.columns), None)
+    hours = df[h_col].fillna(0).astype(float) if h_col else leave_days(df).fillna(0).astype(float) * 8
+    res_leave = hours.groupby(df['dt'].dt.strftime('%b %Y').to_numpy(), sort=False).sum().rename_axis('Month_Year').reset_index(name='Total Leave Hours')
+    dt_df = calendar(state)
+    if dt_df.empty: return {}
+    dt_df = dt_df.assign(Month_Year=dt_df['dt'].dt.strftime('%b %Y'))
+    res = dt_df[dt_df['IsWorkingDay'] == 1].groupby('Month_Year').size().reset_index(name='Working Days')
+    res = res.merge(res_leave, on='Month_Year', how='left').fillna(0)
+    res['Active EMP'] = headcount(state)
+    res['Total Available Org Hours'] = res['Active EMP'] * 8 * res['Working Days']
+    res['Leave Impact %'] = (res['Total Leave Hours'] / res['Total Available Org Hours'].replace(0, 1)) * 100
+    return {'res': res, 'month_order': dt_df['Month_Year'].unique().tolist()}
+
+def ref_plt_top(state):
+    df = filtered('leave_applications', state)
+    if df.empty: return {}
+    df = only_active(df)
+    if df.empty: return {'msg': "No Approved/Open Leaves Found"}
+    df = DB.attach(df, 'employee_name_t').assign(days=leave_days(df))
+    top = df.groupby('employee_name_t', observed=True).agg(**{"Leave Instances": ('emp_key', 'count'), "Leave Days": ('days', 'sum')}).reset_index()
+    top = top.sort_values(['Leave Instances', 'Leave Days'], ascending=[False, False]).head(10)
+    m = top.melt(id_vars='employee_name_t', value_vars=['Leave Instances', 'Leave Days'], var_name='Metric', value_name='Value')
+    return {'top': top, 'm': m}
+
+def ref_plt_avail(state):
+    dates = calendar(state)
+    if dates.empty: return {'msg': "No Dates in Selected Period"}
+    dates = dates[dates['IsWorkingDay'] == 1]
+    if dates.empty: return {'msg': "No Working Days in Selected Period"}
+    total_count = headcount(state)
+    on_leave = leave_occupancy(only_active(filtered('leave_applications', state)))['date_key'].value_counts()
+    res = pd.DataFrame({'Date': dates['dt'].dt.normalize().to_numpy()})
+    res['Employees on Leave'] = on_leave.reindex(dates['date_key'].to_numpy(), fill_value=0).to_numpy()
+    res['Available Employees'] = (total_count - res['Employees on Leave']).clip(lower=0)
+    grain = time_grain(res['Date'])
+    res = res.merge(grain_buckets(res['Date'], grain)[['Day', 'First', 'Last', 'DayLabel', 'DayNum']], left_on='Date', right_on='Day')
+    if grain != 'D':
+        res = res.groupby(['First', 'Last', 'DayLabel', 'DayNum'])[['Available Employees', 'Employees on Leave']].mean().round(1).reset_index()
+    res = res.assign(Date=res['First'], Date_To=res['Last'])
+    m = res.melt(id_vars=['Date', 'Date_To', 'DayLabel', 'DayNum'], value_vars=['Available Employees', 'Employees on Leave'],
+                 var_name='Category', value_name='Count')
+    return {'m': m, 'total_count': total_count, 'grain': grain}
+
+def ref_plt_daily_att(state):
+    att = attendance(state)
+    if att.empty: return {}
+    working = calendar(state._replace(months=None, dims=()))
+    att = att[att['date_key'].isin(working.loc[working['IsWorkingDay'] == 1, 'date_key'])]
+    if att.empty: return {'msg': "No Attendance on Working Days"}
+    presence = att['presence_type'].astype(object)
+    presence = presence.mask(presence.isna() | (presence == ''), 'On Leave')
+    c = att.assign(presence_type=presence).groupby(['date_key', 'presence_type']).size().reset_index(name='Count')
+    days = pd.to_datetime(c['date_key'].unique(), unit='D')
+    grain = time_grain(days)
+    c = grain_buckets(days, grain).merge(c, on='date_key')
+    c = c.groupby(['First', 'Last', 'DayLabel', 'DayNum', 'presence_type'])['Count'].sum().reset_index()
+    rank = c['presence_type'].map({p: i for i, p in enumerate(PRESENCE_ORDER)}).fillna(len(PRESENCE_ORDER))
+    c = c.assign(rank=rank, dt_norm=c['First'], dt_to=c['Last']).sort_values(['rank', 'First'], kind='stable', ignore_index=True)
+    return {'c': c[['dt_norm', 'dt_to', 'DayLabel', 'DayNum', 'presence_type', 'Count']], 'grain': grain}
+
+def ref_plt_hrs_dist(state):
+    att = attendance(state)
+    if att.empty: return {}
+    wfo = att[(att['presence_type'] == 'Work From Office') & att['working_hours'].notna()]
+    if wfo.empty: return {'msg': "No WFO Data"}
+    wfo = DB.attach(wfo, 'employee_name_t').assign(**{'Office Hrs Bucket': hours_bucket(wfo['working_hours']),
+                                                       'hours': wfo['working_hours'].astype(float)})
+    res = wfo.groupby('Office Hrs Bucket', observed=True).agg(Total_Emp_WFO=('employee_name_t', 'nunique'), Avg_Office_Hours=('hours', 'mean'))
+    return {'res': res.reindex(pd.CategoricalIndex(HOURS_BUCKETS, name='Office Hrs Bucket')).reset_index()}
+
+def ref_plt_wfh_comp(state):
+    att = attendance(state)
+    if att.empty: return {}
+    ym = app_month(att)
+    # Every employee-month with attendance, counting its distinct WFH days (0 included)
+    per_month = att.groupby(['emp_key', ym.rename('ym')]).size().rename('rows').reset_index()
+    wfh = att[att['presence_type'] == 'Work From Home'].groupby(['emp_key', ym.rename('ym')])['date_key'].nunique().rename('wfh_days')
+    per_month = per_month.join(wfh, on=['emp_key', 'ym']).fillna({'wfh_days': 0}).sort_values('ym', kind='stable')
+    per_month['Month_Year'] = [app.month_label(int(k)) for k in per_month['ym']]
+    per_month['WFH Bucket'] = np.where(per_month['wfh_days'] > 9, "WFH > 9", "WFH <= 9")
+    c = per_month.groupby(['Month_Year', 'WFH Bucket']).size().reset_index(name='Distinct_Employees')
+    return {'c': c, 'month_order': per_month['Month_Year'].unique().tolist()}
+
+def ref_tbl_matrix(state):
+    df = filtered('leave_applications', state)
+    if df.empty: return pd.DataFrame()
+    df = DB.attach(df, 'department_name_t').assign(days=leave_days(df))
+    p = df.pivot_table(index='leave_type', columns='department_name_t', values='days', aggfunc='sum', fill_value=0, observed=True)
+    p.index.name, p.columns.name = None, None
+    p.loc['Total'] = p.sum()
+    p['Total'] = p.sum(axis=1)
+    return p.map(lambda x: f"{x:.2f}" if x != 0 else "").reset_index().rename(columns={'index': 'Leave type'})
+
+REFERENCE = {
+    'plt_trend': ref_plt_trend,
+    'plt_util': ref_plt_util,
+    'plt_top': ref_plt_top,
+    'plt_avail': ref_plt_avail,
+    'tbl_matrix': ref_tbl_matrix,
+    'plt_daily_att': ref_plt_daily_att,
+    'plt_hrs_dist': ref_plt_hrs_dist,
+    'plt_wfh_comp': ref_plt_wfh_comp,
+}
+
+def mismatch(a, b, path=""):
+    """Where query output `a` differs from reference `b` (None when equal: same keys, columns and
+    rows, numbers within rounding, whatever the dtypes)."""
+    if isinstance(a, dict) or isinstance(b, dict):
+        if not isinstance(a, dict) or not isinstance(b, dict) or set(a) != set(b): return f"{path}: keys {a if not isinstance(a, dict) else sorted(a)} vs {b if not isinstance(b, dict) else sorted(b)}"
+        return next((m for k in a if (m := mismatch(a[k], b[k], f"{path}.{k}"))), None)
+    if isinstance(a, pd.DataFrame):
+        a, b = a.reset_index(drop=True), b.reset_index(drop=True)
+        if list(a.columns) != list(b.columns) or len(a) != len(b): return f"{path}: columns {list(a.columns)} x {len(a)} vs {list(b.columns)} x {len(b)}"
+        for c in a.columns:
+            x, y = a[c], b[c]
+            if pd.api.types.is_numeric_dtype(x) and pd.api.types.is_numeric_dtype(y):
+                same = np.allclose(x.astype(float), y.astype(float), equal_nan=True, atol=1e-9)
+            else:
+                same = x.astype(object).where(x.notna(), None).tolist() == y.astype(object).where(y.notna(), None).tolist()
+            if not same: return f"{path}[{c}]: {x.tolist()[:5]} vs {y.tolist()[:5]}"
+        return None
+    if isinstance(a, (list, tuple)): return None if list(a) == list(b) else f"{path}: {list(a)[:5]} vs {list(b)[:5]}"
+    return None if a == b else f"{path}: {a} vs {b}"
+
+def random_state():
+    """Random Period selection (All Time, year, quarter or months) and a few random slicer values."""
+    y = random.choice(["All"] + sorted(DB.Tree))
+    q = random.choice(["All"] + sorted(DB.Tree[y])) if y != "All" else "All"
+    m = random.sample(DB.Tree[y][q], random.randint(1, len(DB.Tree[y][q]))) if q != "All" and random.random() < 0.3 else []
+    lists = {'dept': 'D', 'emp': 'E', 'et': 'ET', 'mgr': 'M', 'ws': 'WS', 'lt': 'LT', 'at': 'AT', 'proj': 'PN', 'pm': 'PM'}
+    slicers = {k: random.choice(DB.Lists[l]) for k, l in lists.items() if DB.Lists[l] and random.random() < 0.25}
+    return (y, q, m, slicers), make_state(y, q, m, **slicers)
+
+failures = 0
+for _ in range(STATES):
+    args, state = random_state()
+    for output_id, query in QUERIES.items():
+        diff = mismatch(query(narrow(output_id, state)), REFERENCE[output_id](state), output_id)
+        if diff:
+            failures += 1
+            print(f"MISMATCH {args}: {diff}")
+print(f"Checked {len(QUERIES)} queries on {STATES} slicer states: {failures} mismatches")
+sys.exit(1 if failures else 0)
@@ -0,0 +1,63 @@
+"""Shared compute service: one process on the host loads the dashboard data and owns the result cache,
+answering the filter / aggregate requests (run_query, row_positions) of every web worker over a Unix
+socket, so cache hits are shared by all sessions whichever worker they stick to.
+
+Usage: python compute_service.py [socket path]   (default: $DASHBOARD_COMPUTE_SOCKET)
+DASHBOARD_COMPUTE_KEY must hold a secret shared with the web workers (e.g. from `openssl rand -hex 32`):
+requests are unpickled, so only its holders may connect. Start the workers with both variables set to
+the same values; without the service (or the key) they compute in-process.
+"""
+import os, sys, threading
+from multiprocessing.connection import Listener
+
+ADDRESS = sys.argv[1] if len(sys.argv) > 1 else os.environ.get("DASHBOARD_COMPUTE_SOCKET")
+if not ADDRESS or not os.environ.get("DASHBOARD_COMPUTE_KEY"): sys.exit(__doc__)
+os.environ.pop("DASHBOARD_COMPUTE_SOCKET", None)  # The service itself computes in-process
+import app
+
+HANDLERS = {
+    'run_query': lambda output_id, state: app.run_query(output_id, app.FilterState(*state)),
+    'row_positions': lambda name, state: app.row_positions(name, app.FilterState(*state)),
+}
+reload_lock = threading.Lock()
+
+def ensure_version(version):
+    """Reloads the data once the files on disk changed (a worker's ETL refreshed them), then
+    tells whether the service now serves `version`."""
+    with reload_lock:
+        if version != app.DB.Version and app.data_version() != app.DB.Version:
+            app.DB = app.DashboardData()
+            print(f"Reloaded data: version {app.DB.Version}")
+        return version == app.DB.Version
+
+def serve(conn):
+    """Answers one worker connection's requests until it closes."""
+    with conn:
+        while True:
+            try: fn, args, version = conn.recv()
+            except (EOFError, OSError): return
+            if version != app.DB.Version and not ensure_version(version):
+                conn.send(('stale', app.DB.Version))
+                continue
+            db = app.DB  # The data answering this request
+            try: res = HANDLERS[fn](*args) if db.Version == version else None
+            except Exception as e:
+                conn.send(('error', repr(e)))
+                continue
+            # Another connection may have reloaded the data meanwhile: an answer computed (even partly) on
+            # other tables than the worker's would index its rows wrongly, so it is reported stale instead
+            conn.send(('ok', res) if app.DB is db and db.Version == version else ('stale', app.DB.Version))
+
+if __name__ == "__main__":
+    if os.path.exists(ADDRESS): os.remove(ADDRESS)
+    umask = os.umask(0o177)  # The socket is created owner-only (0600) as it is bound
+    try: listener = Listener(ADDRESS, family='AF_UNIX', authkey=app.COMPUTE_KEY)
+    finally: os.umask(umask)
+    with listener:
+        print(f"Compute service listening on {ADDRESS} (data version {app.DB.Version})")
+        while True:
+            try: conn = listener.accept()
+            except Exception as e:
+                print(f"Rejected connection: {e}")
+                continue
+            threading.Thread(target=serve, args=(conn,), daemon=True).start()
@@ -22,41 +22,34 @@ def run_etl_if_needed():
     try:
         from src.extract import extract_data
         from src.transform import transform_data
+        from src.schedule import get_due_endpoints
         import Config as config
         from concurrent.futures import ThreadPoolExecutor
         import time
 
-        # 1. Check if ETL is needed (Caching Logic)
-        PROCESSED_DATA_DIR = os.path.join(BACKEND_DIR, "data", "processed")
-        threshold_seconds = config.ETL_CACHE_THRESHOLD_HOURS * 3600
-        
-        # We check the 'attendance' file as a proxy for data freshness
-        check_file = os.path.join(PROCESSED_DATA_DIR, "attendance.parquet")
-        if not os.path.exists(check_file):
-            check_file = os.path.join(PROCESSED_DATA_DIR, "attendance.csv")
-
-        if os.path.exists(check_file):
-            file_age = time.time() - os.path.getmtime(check_file)
-            if file_age < threshold_seconds:
-                print("=" * 60)
-                print(f" [INFO] Data is fresh (age: {int(file_age/60)} mins). Skipping ETL.")
-                print(f" [INFO] Threshold: {config.ETL_CACHE_THRESHOLD_HOURS} hours.")
-                print("=" * 60)
-                return
+        # 1. Check which endpoints are due (Tiered Caching Logic)
+        # Each endpoint refreshes on its own cadence; fresh tables are left untouched.
+        due = get_due_endpoints(config.API_ENDPOINTS, config.ETL_CACHE_THRESHOLD_HOURS)
+        if not due:
+            print("=" * 60)
+            print(f" [INFO] All {len(config.API_ENDPOINTS)} endpoints are fresh. Skipping ETL.")
+            print("=" * 60)
+            return
 
         print("=" * 60)
         print(f"  PHASE 1: Parallel Data Extraction (Fetching from HRMS)")
+        print(f"  Due: {', '.join(due)}")
         print("=" * 60)
         start_time = time.time()
         
-        # Use ThreadPoolExecutor for parallel API calls
-        with ThreadPoolExecutor(max_workers=len(config.API_ENDPOINTS)) as executor:
-            futures = [
-                executor.submit(extract_data, name, url, config.API_HEADERS)
-                for name, url in config.API_ENDPOINTS.items()
-            ]
-            for future in futures:
-                future.result() # Wait for all to finish
+        # Use ThreadPoolExecutor for parallel API calls (submitted in priority order)
+        with ThreadPoolExecutor(max_workers=min(len(due), config.ETL_MAX_WORKERS)) as executor:
+            futures = {
+                name: executor.submit(extract_data, name, config.API_ENDPOINTS[name]["url"], config.API_HEADERS)
+                for name in due
+            }
+            # Wait for all to finish; only successfully fetched endpoints are re-derived
+            refreshed = [name for name, future in futures.items() if future.result()]
 
         print(f"\n[SUCCESS] Extraction completed in {time.time() - start_time:.2f} seconds.")
 
@@ -64,7 +57,7 @@ def run_etl_if_needed():
         print("  PHASE 2: Data Transformation")
         print("=" * 60)
         start_trans = time.time()
-        transform_data()
+        transform_data(refreshed)
         print(f"[SUCCESS] Transformation completed in {time.time() - start_trans:.2f} seconds.")
         print(f"[TOTAL ETL TIME] {time.time() - start_time:.2f} seconds.\n")
 